@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from models import StockPrice
+
+WINDOW_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+def parse_window(window: str) -> timedelta:
+    """Parse a window label such as "1m", "15m" or "1h" into a timedelta"""
+    try:
+        amount, unit = int(window[:-1]), WINDOW_UNITS[window[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Invalid aggregation window: {window!r}")
+    if amount <= 0:
+        raise ValueError(f"Invalid aggregation window: {window!r}")
+    return timedelta(**{unit: amount})
+
+def _edge_price(ticks, since: datetime, newest: bool):
+    """Correlated subquery for the first (open) or last (close) price of a ticker since a time"""
+    order = (StockPrice.timestamp.desc(), StockPrice.id.desc()) if newest else (StockPrice.timestamp, StockPrice.id)
+    return (
+        select(StockPrice.price)
+        .where(StockPrice.ticker == ticks.ticker, StockPrice.timestamp >= since)
+        .order_by(*order)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+def build_window_aggregates_query(windows: Sequence[str], now: datetime):
+    """One grouped SELECT over the widest window computing mean/OHLC/VWAP/count for every window"""
+    ticks = aliased(StockPrice)
+    volume = func.coalesce(ticks.volume, 1)
+    starts = {window: now - parse_window(window) for window in windows}
+    columns = [ticks.ticker]
+    
+    for window, since in starts.items():
+        in_window = ticks.timestamp >= since
+        columns += [
+            func.count(case((in_window, ticks.id))).label(f"{window}_count"),
+            func.avg(case((in_window, ticks.price))).label(f"{window}_mean"),
+            func.max(case((in_window, ticks.price))).label(f"{window}_high"),
+            func.min(case((in_window, ticks.price))).label(f"{window}_low"),
+            func.sum(case((in_window, ticks.price * volume))).label(f"{window}_notional"),
+            func.sum(case((in_window, volume))).label(f"{window}_volume"),
+            _edge_price(ticks, since, newest=False).label(f"{window}_open"),
+            _edge_price(ticks, since, newest=True).label(f"{window}_close"),
+        ]
+    
+    return (
+        select(*columns)
+        .where(ticks.timestamp >= min(starts.values()))
+        .group_by(ticks.ticker)
+    )
+
+async def compute_window_aggregates(db: AsyncSession, windows: Sequence[str], now: datetime) -> List[Dict]:
+    """Run the grouped aggregate query and return AveragePrice rows for each (ticker, window)"""
+    result = await db.execute(build_window_aggregates_query(windows, now))
+    rows = []
+    
+    for record in result.mappings():
+        for window in windows:
+            if not record[f"{window}_count"]:
+                continue
+            # VWAP is undefined for a window whose ticks all traded zero volume
+            volume = record[f"{window}_volume"]
+            vwap = round(record[f"{window}_notional"] / volume, 2) if volume else None
+            rows.append({
+                "ticker": record["ticker"],
+                "window": window,
+                "average_price": round(record[f"{window}_mean"], 2),
+                "open_price": record[f"{window}_open"],
+                "high_price": record[f"{window}_high"],
+                "low_price": record[f"{window}_low"],
+                "close_price": record[f"{window}_close"],
+                "vwap": vwap,
+                "tick_count": record[f"{window}_count"],
+                "timestamp": now
+            })
+    
+    return rows
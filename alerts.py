@@ -0,0 +1,169 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import AlertRule
+from utils import calculate_percentage_change
+
+# "cross" fires when the price crosses level; "move" fires on a percent move within window_seconds
+ALERT_KINDS = ("cross", "move")
+ALERT_DIRECTIONS = ("up", "down")
+
+# Sorted (threshold, rule id) pairs: the level of cross rules or the percent of move rules
+RuleIndex = List[Tuple[float, int]]
+
+class _MoveWindow:
+    """Ticks of one ticker inside one move-rule window, with its up and down rules sorted by percent"""
+    
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.ticks: Deque[Tuple[float, float]] = deque()  # (POSIX seconds, price)
+        self.rules: Dict[str, RuleIndex] = {"up": [], "down": []}
+    
+    def add(self, ts: float, price: float) -> float:
+        """Record a tick and return the percent move since the oldest tick in the window"""
+        self.ticks.append((ts, price))
+        cutoff = ts - self.window_seconds
+        while self.ticks[0][0] < cutoff:
+            self.ticks.popleft()
+        return calculate_percentage_change(self.ticks[0][1], price)
+    
+    def __bool__(self) -> bool:
+        return bool(self.rules["up"] or self.rules["down"])
+
+class AlertEngine:
+    """Armed alert rules indexed per ticker so each tick only evaluates the rules it can trigger"""
+    
+    def __init__(self):
+        self.rules: Dict[int, AlertRule] = {}
+        self._last_prices: Dict[str, float] = {}
+        # ticker -> direction -> sorted levels of cross rules
+        self._crosses: Dict[str, Dict[str, RuleIndex]] = {}
+        # ticker -> window_seconds -> move window
+        self._moves: Dict[str, Dict[float, _MoveWindow]] = {}
+        
+        self.ticks_evaluated = 0
+        self.alerts_triggered = 0
+    
+    def load(self, rules: Iterable[AlertRule]):
+        """Arm every active rule, e.g. from the database at startup"""
+        for rule in rules:
+            if rule.active:
+                self.add(rule)
+    
+    def add(self, rule: AlertRule):
+        """Arm a rule, replacing any armed rule with the same id"""
+        self.remove(rule.id)
+        self.rules[rule.id] = rule
+        if rule.kind == "cross":
+            crosses = self._crosses.setdefault(rule.ticker, {"up": [], "down": []})
+            insort(crosses[rule.direction], (rule.level, rule.id))
+        else:
+            windows = self._moves.setdefault(rule.ticker, {})
+            window = windows.get(rule.window_seconds)
+            if window is None:
+                window = windows[rule.window_seconds] = _MoveWindow(rule.window_seconds)
+            insort(window.rules[rule.direction], (rule.percent, rule.id))
+    
+    def remove(self, rule_id: int) -> Optional[AlertRule]:
+        """Disarm a rule; returns it if it was armed"""
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return None
+        
+        if rule.kind == "cross":
+            index = self._crosses[rule.ticker][rule.direction]
+            index.pop(bisect_left(index, (rule.level, rule.id)))
+        else:
+            window = self._moves[rule.ticker][rule.window_seconds]
+            index = window.rules[rule.direction]
+            index.pop(bisect_left(index, (rule.percent, rule.id)))
+            if not window:
+                del self._moves[rule.ticker][rule.window_seconds]
+        return rule
+    
+    def on_tick(self, ticker: str, price: float, timestamp: datetime) -> List[Dict]:
+        """Evaluate a tick and return an event for every rule it triggered (triggered rules are disarmed)"""
+        self.ticks_evaluated += 1
+        triggered: List[Tuple[int, Optional[float]]] = []
+        
+        previous = self._last_prices.get(ticker)
+        self._last_prices[ticker] = price
+        crosses = self._crosses.get(ticker)
+        if crosses and previous is not None:
+            if price > previous:
+                # Up-crosses with previous < level <= price
+                index = crosses["up"]
+                start = bisect_right(index, (previous, float("inf")))
+                end = bisect_right(index, (price, float("inf")))
+            else:
+                # Down-crosses with price <= level < previous
+                index = crosses["down"]
+                start = bisect_left(index, (price, -1))
+                end = bisect_left(index, (previous, -1))
+            triggered.extend((rule_id, None) for _, rule_id in index[start:end])
+        
+        ts = timestamp.timestamp()
+        for window in self._moves.get(ticker, {}).values():
+            change = window.add(ts, price)
+            direction = "up" if change > 0 else "down"
+            # Rules whose percent is at most the size of the move, i.e. a prefix of the sorted index
+            index = window.rules[direction]
+            end = bisect_right(index, (abs(change), float("inf")))
+            triggered.extend((rule_id, change) for _, rule_id in index[:end])
+        
+        events = []
+        for rule_id, change in triggered:
+            rule = self.remove(rule_id)
+            events.append({
+                "type": "price_alert",
+                "rule_id": rule.id,
+                "owner": rule.owner,
+                "ticker": ticker,
+                "kind": rule.kind,
+                "direction": rule.direction,
+                "level": rule.level,
+                "percent": rule.percent,
+                "window_seconds": rule.window_seconds,
+                "change_percent": change,
+                "price": round(price, 2),
+                "timestamp": timestamp
+            })
+        self.alerts_triggered += len(events)
+        return events
+    
+    def on_round(self, prices: Mapping[str, float], timestamp: datetime) -> List[Dict]:
+        """Evaluate a whole round of prices, visiting only the tickers that have armed rules"""
+        events = []
+        for ticker in self._crosses.keys() | self._moves.keys():
+            price = prices.get(ticker)
+            if price is not None:
+                events.extend(self.on_tick(ticker, price, timestamp))
+        return events
+    
+    def metrics(self) -> Dict:
+        """Alert engine counters for monitoring"""
+        return {
+            "armed_rules": len(self.rules),
+            "ticks_evaluated": self.ticks_evaluated,
+            "alerts_triggered": self.alerts_triggered
+        }
+
+async def mark_triggered(db: AsyncSession, events: List[Dict]):
+    """Persist that the rules behind these alert events fired and are no longer active"""
+    # Core executemany, so rules deleted in the meantime are simply skipped
+    rules = AlertRule.__table__
+    statement = (
+        update(rules)
+        .where(rules.c.id == bindparam("rule_id"))
+        .values(active=False, triggered_at=bindparam("fired_at"), triggered_price=bindparam("fired_price"))
+    )
+    await db.execute(statement, [
+        {"rule_id": event["rule_id"], "fired_at": event["timestamp"], "fired_price": event["price"]}
+        for event in events
+    ])
+    await db.commit()
@@ -0,0 +1,145 @@
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Trade
+from schemas import BulkTradeError, BulkTradeResponse, TradeCreate
+from serialization import json_loads
+
+# A parsed record: the decoded JSON value, or the error that prevented decoding it
+ParsedRecord = Tuple[Optional[object], Optional[str]]
+
+def iter_json_array(body: bytes) -> AsyncIterator[ParsedRecord]:
+    """Records of a JSON array request body; raises ValueError if the body is not an array"""
+    records = json_loads(body)
+    if not isinstance(records, list):
+        raise ValueError("Request body must be a JSON array of trades")
+    return _as_records(records)
+
+async def _as_records(records: List) -> AsyncIterator[ParsedRecord]:
+    """Wrap already decoded records in the parsed-record stream"""
+    for record in records:
+        yield record, None
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[ParsedRecord]:
+    """Records of a newline-delimited JSON body, decoded as the body streams in"""
+    pending = b""
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield _decode_line(line)
+    if pending.strip():
+        yield _decode_line(pending)
+
+def _decode_line(line: bytes) -> ParsedRecord:
+    """Decode one NDJSON line, reporting invalid JSON instead of raising"""
+    try:
+        return json_loads(line), None
+    except ValueError as e:
+        return None, f"Invalid JSON: {str(e)}"
+
+def _validation_message(error: ValidationError) -> str:
+    """Compact one-line summary of a pydantic validation error"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'trade'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+class BulkTradeInserter:
+    """Validate trades in chunks and insert each chunk with one INSERT ... RETURNING statement"""
+    
+    def __init__(self, db: AsyncSession, chunk_size: int = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.BULK_TRADE_CHUNK_SIZE
+        self.ids: List[Optional[int]] = []
+        self.errors: List[BulkTradeError] = []
+        self.inserted = 0
+        # (id, row) of every inserted trade, for folding into the position ledger after commit
+        self.inserted_trades: List[Tuple[int, Dict]] = []
+        
+        self._chunk_rows: List[Dict] = []
+        self._chunk_indexes: List[int] = []
+    
+    async def add_all(self, records: AsyncIterable[ParsedRecord]):
+        """Consume parsed records, flushing a chunk whenever it fills up"""
+        async for record, parse_error in records:
+            index = len(self.ids)
+            self.ids.append(None)
+            
+            if parse_error is not None:
+                self.errors.append(BulkTradeError(index=index, detail=parse_error))
+                continue
+            
+            try:
+                trade = TradeCreate.model_validate(record)
+            except ValidationError as e:
+                self.errors.append(BulkTradeError(index=index, detail=_validation_message(e)))
+                continue
+            
+            self._chunk_rows.append({
+                "ticker": trade.ticker,
+                "price": trade.price,
+                "quantity": trade.quantity,
+                "side": trade.side,
+                "timestamp": trade.timestamp or datetime.now()
+            })
+            self._chunk_indexes.append(index)
+            
+            if len(self._chunk_rows) >= self.chunk_size:
+                await self.flush()
+        
+        await self.flush()
+    
+    async def flush(self):
+        """Insert the pending chunk inside a savepoint so a failing chunk leaves the others intact"""
+        rows, indexes = self._chunk_rows, self._chunk_indexes
+        if not rows:
+            return
+        self._chunk_rows, self._chunk_indexes = [], []
+        
+        try:
+            ids = await self._insert(rows)
+        except Exception:
+            # Retry the chunk row by row so each failure is reported against its own row
+            for index, row in zip(indexes, rows):
+                try:
+                    ids = await self._insert([row])
+                except Exception as e:
+                    # The driver error without SQLAlchemy's statement and parameter dump
+                    self.errors.append(BulkTradeError(index=index, detail=f"Insert failed: {getattr(e, 'orig', e)}"))
+                else:
+                    self._record(index, row, ids[0])
+            return
+        
+        for index, row, trade_id in zip(indexes, rows, ids):
+            self._record(index, row, trade_id)
+    
+    async def _insert(self, rows: List[Dict]) -> List[int]:
+        """Insert rows inside a savepoint of the request transaction and return their ids in order"""
+        async with self.db.begin_nested():
+            result = await self.db.execute(
+                insert(Trade).returning(Trade.id, sort_by_parameter_order=True),
+                rows
+            )
+            return result.scalars().all()
+    
+    def _record(self, index: int, row: Dict, trade_id: int):
+        """Remember the id of an inserted row"""
+        self.ids[index] = trade_id
+        self.inserted_trades.append((trade_id, row))
+        self.inserted += 1
+    
+    def response(self) -> BulkTradeResponse:
+        """Per-row outcome of the bulk request"""
+        return BulkTradeResponse(
+            inserted=self.inserted,
+            failed=len(self.errors),
+            ids=self.ids,
+            errors=sorted(self.errors, key=lambda error: error.index)
+        )
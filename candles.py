@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from aggregates import parse_window
+from models import Candle
+
+# Bucket boundaries are aligned to the epoch so every process agrees on them
+_EPOCH = datetime(1970, 1, 1)
+
+# Dialect-specific INSERT constructs that support ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def parse_intervals(intervals: Iterable[str]) -> Dict[str, timedelta]:
+    """Map candle interval labels such as "1s" or "5m" to their bucket widths"""
+    return {interval: parse_window(interval) for interval in intervals}
+
+def bucket_start(timestamp: datetime, step: timedelta) -> datetime:
+    """Start of the bucket of width step containing timestamp"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.replace(tzinfo=None)
+    return _EPOCH + ((timestamp - _EPOCH) // step) * step
+
+def rollup_ticks(rows: List[Dict], steps: Dict[str, timedelta]) -> List[Dict]:
+    """Fold a batch of ticks into partial OHLCV bars, one per (ticker, interval, bucket)"""
+    bars: Dict[tuple, Dict] = {}
+    
+    for row in rows:
+        price = row["price"]
+        volume = row.get("volume") or 0
+        for interval, step in steps.items():
+            key = (row["ticker"], interval, bucket_start(row["timestamp"], step))
+            bar = bars.get(key)
+            if bar is None:
+                bars[key] = {
+                    "ticker": key[0],
+                    "interval": interval,
+                    "bucket_start": key[2],
+                    "open_price": price,
+                    "high_price": price,
+                    "low_price": price,
+                    "close_price": price,
+                    "volume": volume,
+                    "tick_count": 1
+                }
+                continue
+            if price > bar["high_price"]:
+                bar["high_price"] = price
+            if price < bar["low_price"]:
+                bar["low_price"] = price
+            bar["close_price"] = price
+            bar["volume"] += volume
+            bar["tick_count"] += 1
+    
+    return list(bars.values())
+
+def upsert_candles(db: Session, bars: List[Dict]):
+    """Merge partial bars into the candles table, extending any bar already stored for the bucket"""
+    if not bars:
+        return
+    
+    dialect = db.get_bind().dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        raise ValueError(f"Candle rollup is not supported on {dialect} databases")
+    
+    stmt = _UPSERT_INSERTS[dialect](Candle)
+    new = stmt.excluded
+    # The open price of an existing bar is kept; later ticks only extend it
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Candle.ticker, Candle.interval, Candle.bucket_start],
+        set_={
+            "high_price": case((new.high_price > Candle.high_price, new.high_price), else_=Candle.high_price),
+            "low_price": case((new.low_price < Candle.low_price, new.low_price), else_=Candle.low_price),
+            "close_price": new.close_price,
+            "volume": Candle.volume + new.volume,
+            "tick_count": Candle.tick_count + new.tick_count
+        }
+    )
+    db.execute(stmt, bars)
+
+def build_candles_query(
+    ticker: str,
+    interval: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """SELECT for the bars of one ticker and interval within [start, end]"""
+    query = select(Candle).where(Candle.ticker == ticker, Candle.interval == interval)
+    
+    if start is not None:
+        query = query.where(Candle.bucket_start >= start)
+    
+    if end is not None:
+        query = query.where(Candle.bucket_start <= end)
+    
+    return query
@@ -4,20 +4,89 @@ from typing import Optional
 class Settings:
     # Database configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./trading_system.db")
+    # Async driver URL for the API; derived from DATABASE_URL (aiosqlite/asyncpg) when unset
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
     
     # WebSocket configuration
     WEBSOCKET_HOST: str = "0.0.0.0"
     WEBSOCKET_PORT: int = 8001
     
+    # Stream protocol requested by websocket_client: "json", "compact" (JSON deltas) or "binary" (struct deltas)
+    STREAM_PROTOCOL: str = os.getenv("STREAM_PROTOCOL", "json")
+    # Seconds between delta frames that carry every ticker, resyncing clients that lost frames (0 disables)
+    DELTA_KEYFRAME_INTERVAL: float = float(os.getenv("DELTA_KEYFRAME_INTERVAL", "5"))
+    
+    # Trades validated and inserted per statement by POST /trades/bulk
+    BULK_TRADE_CHUNK_SIZE: int = int(os.getenv("BULK_TRADE_CHUNK_SIZE", "1000"))
+    
+    # Seconds between position ledger snapshots; a restart replays only trades after the latest one
+    POSITION_SNAPSHOT_INTERVAL: float = float(os.getenv("POSITION_SNAPSHOT_INTERVAL", "60"))
+    
+    # Rows fetched per server-side cursor batch by the streaming export endpoints
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+    
+    # Outbound queue per WebSocket/SSE client and what to do when it fills up
+    CLIENT_QUEUE_SIZE: int = int(os.getenv("CLIENT_QUEUE_SIZE", "256"))
+    CLIENT_QUEUE_POLICY: str = os.getenv("CLIENT_QUEUE_POLICY", "conflate")  # "drop_oldest", "conflate" or "disconnect"
+    
+    # SSE price stream: batch ticks into one frame every N seconds (0 sends each tick) and heartbeat idle streams
+    SSE_BATCH_INTERVAL: float = float(os.getenv("SSE_BATCH_INTERVAL", "0"))
+    SSE_HEARTBEAT_INTERVAL: float = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+    
     # Trading configuration
-    PRICE_CHANGE_THRESHOLD: float = 0.02  # 2% threshold for notifications
+    PRICE_CHANGE_THRESHOLD: float = float(os.getenv("PRICE_CHANGE_THRESHOLD", "2.0"))  # percent, i.e. 2.0 = 2% move in a minute
     AVERAGE_CALCULATION_INTERVAL: int = 300  # 5 minutes in seconds
+    AVERAGE_WINDOWS: list = os.getenv("AVERAGE_WINDOWS", "1m,5m,15m,1h").split(",")
+    
+    # Rotate stock prices older than this many days into monthly archive tables (0 disables)
+    STOCK_PRICE_RETENTION_DAYS: int = int(os.getenv("STOCK_PRICE_RETENTION_DAYS", "0"))
+    STOCK_PRICE_ROTATION_INTERVAL: int = int(os.getenv("STOCK_PRICE_ROTATION_INTERVAL", "3600"))  # seconds
+    
+    # Batched price ingestion
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+    INGEST_FLUSH_INTERVAL: float = float(os.getenv("INGEST_FLUSH_INTERVAL", "1.0"))  # seconds
+    INGEST_MAX_PENDING: int = int(os.getenv("INGEST_MAX_PENDING", "100000"))
+    
+    # Recent-price cache in front of /stock-prices (ticks kept per ticker, tickers kept in total;
+    # the API raises the ticker limit to the simulated universe size when that is larger)
+    PRICE_CACHE_DEPTH: int = int(os.getenv("PRICE_CACHE_DEPTH", "1000"))
+    PRICE_CACHE_MAX_TICKERS: int = int(os.getenv("PRICE_CACHE_MAX_TICKERS", "1000"))
+    # The cache only sees ticks written by this process; enable it only when nothing else (such as
+    # websocket_server.py on the same database) writes stock_prices
+    PRICE_CACHE_SOLE_WRITER: bool = os.getenv("PRICE_CACHE_SOLE_WRITER", "false").lower() == "true"
+    
+    # OHLCV bar intervals rolled up from ingested ticks (empty disables the rollup)
+    CANDLE_INTERVALS: list = [w for w in os.getenv("CANDLE_INTERVALS", "1s,1m,5m,1h").split(",") if w]
     
     # Moving average configuration
     SHORT_MA_PERIOD: int = 50
     LONG_MA_PERIOD: int = 200
+    MA_TYPE: str = "sma"  # "sma", "ema" or "wma"
+    
+    # Live crossover signals on simulated ticks (periods are in ticks)
+    LIVE_SHORT_MA_PERIOD: int = 5
+    LIVE_LONG_MA_PERIOD: int = 20
+    
+    # Historical data loading
+    HISTORICAL_CSV_CHUNKSIZE: int = int(os.getenv("HISTORICAL_CSV_CHUNKSIZE", "1000000"))
+    HISTORICAL_DATE_FORMAT: str = os.getenv("HISTORICAL_DATE_FORMAT", "%Y-%m-%d")
+    HISTORICAL_PRICE_DTYPE: str = os.getenv("HISTORICAL_PRICE_DTYPE", "float64")  # or "float32"
+    HISTORICAL_CACHE_ENABLED: bool = os.getenv("HISTORICAL_CACHE_ENABLED", "true").lower() == "true"
+    HISTORICAL_CACHE_DIR: str = os.getenv("HISTORICAL_CACHE_DIR", ".historical_cache")
+    
+    # Backtesting configuration (0 uses every available CPU core)
+    BACKTEST_MAX_WORKERS: int = int(os.getenv("BACKTEST_MAX_WORKERS", "0"))
     
     # Stock tickers for simulation
     STOCK_TICKERS: list = ["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN", "META", "NVDA"]
+    
+    # Market simulator: "uniform" (±5% jumps per round whatever the tick rate), "gbm" or "random_walk";
+    # drift and volatility are per second and scaled by the measured time between rounds
+    SIMULATOR_MODEL: str = os.getenv("SIMULATOR_MODEL", "uniform")
+    SIMULATOR_SEED: Optional[int] = int(os.getenv("SIMULATOR_SEED")) if os.getenv("SIMULATOR_SEED") else None
+    SIMULATOR_UNIVERSE_SIZE: int = int(os.getenv("SIMULATOR_UNIVERSE_SIZE", "0"))  # pads STOCK_TICKERS with SIM00001..., at most 65535
+    SIMULATOR_TICK_RATE: float = float(os.getenv("SIMULATOR_TICK_RATE", "0"))  # rounds per second; 0 pauses 1-3 s
+    SIMULATOR_DRIFT: float = float(os.getenv("SIMULATOR_DRIFT", "0"))
+    SIMULATOR_VOLATILITY: float = float(os.getenv("SIMULATOR_VOLATILITY", "0.01"))
 
 settings = Settings()
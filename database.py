@@ -1,8 +1,25 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from utils import logger
+
+# asyncio drivers used for each sync database backend
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+def to_async_url(database_url: str) -> str:
+    """Convert a sync database URL to the equivalent asyncio driver URL"""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() == driver:
+        return database_url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
 
 # Create database engine
 engine = create_engine(
@@ -11,7 +28,30 @@ engine = create_engine(
     pool_recycle=300
 )
 
+# Async engine for request handlers, so queries never block the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    pool_recycle=300
+)
+
+def enable_sqlite_savepoints(sync_engine):
+    """Open the transaction before a first SAVEPOINT, which pysqlite/aiosqlite would otherwise run in autocommit"""
+    if sync_engine.dialect.name != "sqlite":
+        return
+    
+    # Without a BEGIN the SAVEPOINT starts its own transaction and RELEASE commits it. Other transactions keep
+    # the driver's lazy BEGIN, so read-then-write sessions don't hold a read lock while they upgrade to write.
+    @event.listens_for(sync_engine, "savepoint")
+    def begin_before_savepoint(conn, name):
+        if not conn.connection.driver_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN")
+
+enable_sqlite_savepoints(engine)
+enable_sqlite_savepoints(async_engine.sync_engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_db():
@@ -22,6 +62,36 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    migrate_schema()
+
+def migrate_schema(bind=None):
+    """Bring existing tables up to the current models by adding missing nullable columns and indexes"""
+    bind = bind or engine
+    inspector = inspect(bind)
+    
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable:
+                logger.warning(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            logger.info(f"Added column {column.name} to {table.name}")
+        
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=bind)
+                logger.info(f"Created index {index.name} on {table.name}")
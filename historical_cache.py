@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from utils import logger
+
+class HistoricalDataCache:
+    """Columnar on-disk cache of parsed historical CSVs as memory-mapped NumPy arrays"""
+    
+    INDEX_FILE = "index.json"
+    COLUMNS = ("ticker_codes", "dates", "prices")
+    
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or settings.HISTORICAL_CACHE_DIR
+    
+    def _source_key(self, csv_file: str) -> dict:
+        """Identify a source file by absolute path, modification time, size and the settings it is parsed with"""
+        path = os.path.abspath(csv_file)
+        stat = os.stat(path)
+        return {
+            "source": path,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "price_dtype": settings.HISTORICAL_PRICE_DTYPE,
+            "date_format": settings.HISTORICAL_DATE_FORMAT
+        }
+    
+    def _cache_path(self, source_key: dict) -> str:
+        """Directory holding the cache entry for a source key"""
+        digest = hashlib.sha1(json.dumps(source_key, sort_keys=True).encode()).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(source_key["source"]))[0]
+        return os.path.join(self.cache_dir, f"{stem}-{digest}")
+    
+    def load(
+        self,
+        csv_file: str,
+        tickers: Optional[Iterable[str]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Optional[pd.DataFrame]:
+        """Load cached data for a CSV file, or return None if there is no current cache entry"""
+        path = self._cache_path(self._source_key(csv_file))
+        index_path = os.path.join(path, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return None
+        
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            columns = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in self.COLUMNS
+            }
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable historical data cache {path}: {str(e)}")
+            return None
+        
+        categories = index["tickers"]
+        offsets = index["offsets"]
+        wanted = set(tickers) if tickers else None
+        start = np.datetime64(pd.Timestamp(start_date)) if start_date is not None else None
+        end = np.datetime64(pd.Timestamp(end_date)) if end_date is not None else None
+        
+        if wanted is None and start is None and end is None:
+            # Full loads hand the memory-mapped columns straight to pandas
+            ticker_codes, dates, prices = (columns[name] for name in self.COLUMNS)
+        else:
+            # Rows are sorted by (ticker, date), so each selection is one slice per ticker
+            slices = []
+            for ticker, (lo, hi) in zip(categories, offsets):
+                if wanted is not None and ticker not in wanted:
+                    continue
+                ticker_dates = columns["dates"][lo:hi]
+                if start is not None:
+                    lo += int(np.searchsorted(ticker_dates, start, side="left"))
+                if end is not None:
+                    hi = lo + int(np.searchsorted(columns["dates"][lo:hi], end, side="right"))
+                if hi > lo:
+                    slices.append(slice(lo, hi))
+            
+            ticker_codes, dates, prices = (
+                np.concatenate([columns[name][s] for s in slices]) if slices else columns[name][:0]
+                for name in self.COLUMNS
+            )
+        
+        return pd.DataFrame(
+            {
+                "ticker": pd.Categorical.from_codes(ticker_codes, categories=categories),
+                "date": dates,
+                "price": prices
+            },
+            copy=False
+        )
+    
+    def store(self, csv_file: str, df: pd.DataFrame):
+        """Write a (ticker, date)-sorted frame as the cache entry for a CSV file"""
+        source_key = self._source_key(csv_file)
+        path = self._cache_path(source_key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        
+        tickers = df["ticker"].astype("category")
+        if (tickers.cat.codes < 0).any():
+            # Rows without a ticker have no category code; leave such files to the uncached CSV path
+            logger.warning(f"Not caching {csv_file}: it has rows without a ticker")
+            return
+        counts = np.bincount(tickers.cat.codes.to_numpy(), minlength=len(tickers.cat.categories))
+        stops = np.cumsum(counts)
+        index = {
+            **source_key,
+            "tickers": [str(ticker) for ticker in tickers.cat.categories],
+            "offsets": [[int(stop - count), int(stop)] for count, stop in zip(counts, stops)]
+        }
+        
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            np.save(os.path.join(tmp_path, "ticker_codes.npy"), tickers.cat.codes.to_numpy())
+            np.save(os.path.join(tmp_path, "dates.npy"), df["date"].to_numpy())
+            np.save(os.path.join(tmp_path, "prices.npy"), df["price"].to_numpy())
+            with open(os.path.join(tmp_path, self.INDEX_FILE), "w") as f:
+                json.dump(index, f)
+            
+            self._remove_stale_entries(source_key["source"], keep=path)
+            # Publish the entry atomically so readers never see a partial cache
+            os.replace(tmp_path, path)
+            logger.info(f"Cached {len(df)} historical records for {csv_file} in {path}")
+        
+        except OSError as e:
+            logger.warning(f"Could not write historical data cache for {csv_file}: {str(e)}")
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    
+    def _remove_stale_entries(self, source: str, keep: str):
+        """Delete cache entries left behind by older versions of the same source file"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if path == keep or ".tmp-" in name:
+                continue
+            try:
+                with open(os.path.join(path, self.INDEX_FILE), "r") as f:
+                    if json.load(f).get("source") != source:
+                        continue
+            except (OSError, ValueError):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
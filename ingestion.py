@@ -0,0 +1,190 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+
+from candles import parse_intervals, rollup_ticks, upsert_candles
+from config import settings
+from database import SessionLocal
+from models import StockPrice
+from utils import logger
+
+class PriceIngestionWriter:
+    """Buffer price ticks in memory and bulk-insert them into stock_prices off the event loop"""
+    
+    def __init__(
+        self,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_pending: int = None,
+        candle_intervals: Sequence[str] = None,
+        session_factory=SessionLocal
+    ):
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.INGEST_FLUSH_INTERVAL
+        self.max_pending = max_pending or settings.INGEST_MAX_PENDING
+        self.session_factory = session_factory
+        self.candle_steps = parse_intervals(
+            settings.CANDLE_INTERVALS if candle_intervals is None else candle_intervals
+        )
+        
+        # (ticker, price, volume, timestamp) rows; dicts for the insert are built in the writer thread
+        self._buffer: List[Tuple[str, float, Optional[int], datetime]] = []
+        self._in_flight = 0
+        self._flush_requested = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # A single writer thread keeps batches in order and avoids concurrent SQLite writers
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-ingestion")
+        
+        self.rows_enqueued = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches_written = 0
+        self.candles_written = 0
+        self.flush_errors = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+    
+    @property
+    def pending(self) -> int:
+        """Rows buffered or currently being written"""
+        return len(self._buffer) + self._in_flight
+    
+    async def start(self):
+        """Start the background flush loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Price ingestion writer started (batch_size={self.batch_size}, "
+                f"flush_interval={self.flush_interval}s, max_pending={self.max_pending})"
+            )
+    
+    async def stop(self):
+        """Stop the flush loop and write out everything still buffered"""
+        if self._task is not None:
+            # Let an in-progress flush finish instead of cancelling it mid-write
+            self._stopping = True
+            self._flush_requested.set()
+            await self._task
+            self._task = None
+        
+        while self._buffer and await self._flush():
+            pass
+        if self._buffer:
+            logger.warning(f"Discarding {len(self._buffer)} unwritten prices on shutdown")
+        self._executor.shutdown(wait=True)
+        logger.info(f"Price ingestion writer stopped after writing {self.rows_written} rows")
+    
+    async def submit(self, ticker: str, price: float, timestamp: datetime = None, volume: int = None):
+        """Queue a tick, waiting while the writer is at capacity (backpressure)"""
+        while self.pending >= self.max_pending:
+            self.backpressure_waits += 1
+            self._not_full.clear()
+            self._flush_requested.set()
+            await self._not_full.wait()
+        self._append(ticker, price, timestamp, volume)
+    
+    async def submit_many(self, tickers: Sequence[str], prices: Sequence[float], volumes: Sequence[int], timestamp: datetime):
+        """Queue a whole round of ticks sharing one timestamp, waiting once if the writer is at capacity"""
+        while self.pending >= self.max_pending:
+            self.backpressure_waits += 1
+            self._not_full.clear()
+            self._flush_requested.set()
+            await self._not_full.wait()
+        
+        self._buffer.extend(zip(tickers, prices, volumes, repeat(timestamp)))
+        self.rows_enqueued += len(tickers)
+        if len(self._buffer) >= self.batch_size:
+            self._flush_requested.set()
+    
+    def _append(self, ticker: str, price: float, timestamp: Optional[datetime], volume: Optional[int]):
+        """Buffer a tick and request a flush once a full batch is waiting"""
+        self._buffer.append((ticker, price, volume, timestamp or datetime.now()))
+        self.rows_enqueued += 1
+        if len(self._buffer) >= self.batch_size:
+            self._flush_requested.set()
+    
+    async def _run(self):
+        """Flush whenever a batch fills up or the flush interval elapses"""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            
+            # Drain full batches back to back; back off until the next interval after an error
+            while self._buffer:
+                if not await self._flush() or len(self._buffer) < self.batch_size:
+                    break
+    
+    async def _flush(self) -> bool:
+        """Hand the next batch to the writer thread; returns False if the write failed"""
+        rows = self._buffer[:self.batch_size]
+        del self._buffer[:self.batch_size]
+        self._in_flight = len(rows)
+        started = time.perf_counter()
+        
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write_batch, rows)
+            self.rows_written += len(rows)
+            self.batches_written += 1
+            return True
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error(f"Error writing {len(rows)} buffered prices: {str(e)}")
+            # Retry the batch on the next flush if there is room, otherwise drop it
+            if len(rows) + len(self._buffer) <= self.max_pending:
+                self._buffer[:0] = rows
+            else:
+                self.rows_dropped += len(rows)
+                logger.warning(f"Dropped {len(rows)} prices after a failed flush")
+            return False
+        finally:
+            self._in_flight = 0
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            if self.pending < self.max_pending:
+                self._not_full.set()
+    
+    def _write_batch(self, batch: List[Tuple[str, float, Optional[int], datetime]]):
+        """Insert one batch and roll it up into candles in one transaction (runs in the writer thread)"""
+        rows = [
+            {"ticker": ticker, "price": price, "volume": volume, "timestamp": timestamp}
+            for ticker, price, volume, timestamp in batch
+        ]
+        db = self.session_factory()
+        try:
+            db.execute(insert(StockPrice), rows)
+            bars = rollup_ticks(rows, self.candle_steps) if self.candle_steps else []
+            upsert_candles(db, bars)
+            db.commit()
+            self.candles_written += len(bars)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def metrics(self) -> Dict:
+        """Ingestion counters for monitoring"""
+        return {
+            "pending": self.pending,
+            "rows_enqueued": self.rows_enqueued,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "batches_written": self.batches_written,
+            "candles_written": self.candles_written,
+            "flush_errors": self.flush_errors,
+            "backpressure_waits": self.backpressure_waits,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3)
+        }
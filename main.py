@@ -1,21 +1,32 @@
 import asyncio
 import logging
-import json
-import random
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Literal, Optional
 from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, select
 
-from database import get_db, create_tables, SessionLocal
-from models import Trade, StockPrice, AveragePrice, TradeType
-from schemas import TradeCreate, TradeResponse, TradeFilter, StockPriceResponse
+from database import get_async_db, create_tables, async_engine, AsyncSessionLocal
+from models import Trade, StockPrice, AveragePrice, Candle, AlertRule, TradeType
+from schemas import TradeCreate, TradeResponse, BulkTradeResponse, PositionResponse, AlertRuleCreate, AlertRuleResponse, TradeFilter, StockPriceResponse, CandleResponse, TradingSignal
 from config import settings
+from aggregates import compute_window_aggregates
+from candles import build_candles_query
+from ingestion import PriceIngestionWriter
+from price_cache import RecentPriceCache
+from stream_hub import PriceStreamHub
+from serialization import FastJSONResponse
+from bulk_trades import BulkTradeInserter, iter_json_array, iter_ndjson
+from alerts import AlertEngine, mark_triggered
+from positions import PositionLedger, run_position_snapshots
+from market_simulator import create_price_source
+from pagination import EXPORT_MEDIA_TYPES, after_cursor, newest_first, next_page, stream_export
+from retention import run_stock_price_rotation
+from trading_strategy import MovingAverageCrossoverStrategy
 from utils import logger
 
 # Configure logging
@@ -23,48 +34,90 @@ logging.basicConfig(level=logging.INFO)
 
 # Background task for calculating averages and price simulation
 background_tasks = set()
-stock_prices = {ticker: random.uniform(100, 500) for ticker in settings.STOCK_TICKERS}
-price_subscribers = set()
+price_source = create_price_source()
+stock_prices = price_source.price_map()
+price_stream = PriceStreamHub(price_source.tickers)
+live_strategy = MovingAverageCrossoverStrategy(settings.LIVE_SHORT_MA_PERIOD, settings.LIVE_LONG_MA_PERIOD)
+price_writer = PriceIngestionWriter()
+# The cache always fits the whole simulated universe so live tickers are never evicted
+price_cache = RecentPriceCache(max_tickers=max(settings.PRICE_CACHE_MAX_TICKERS, len(price_source.tickers)))
+position_ledger = PositionLedger()
+alert_engine = AlertEngine()
+
+def publish_trading_signal(signal: TradingSignal):
+    """Queue a live crossover signal for every connected stream subscriber"""
+    price_stream.publish({**signal.model_dump(mode="json"), "type": "trading_signal"})
 
 async def generate_stock_prices():
-    """Generate random stock prices and store them in database"""
-    global stock_prices
-    
-    while True:
+    """Publish simulated stock prices and queue them for batched database writes"""
+    # The simulator advances every ticker in one vectorized step and paces rounds at its tick rate
+    async for prices, volumes in price_source.rounds():
         try:
-            db = SessionLocal()
+            # Every tick of a round shares one timestamp and is handed to each consumer in one call
+            timestamp = datetime.now()
+            tickers = price_source.tickers
+            rounded = prices.round(2).tolist()
+            stock_prices.update(zip(tickers, prices.tolist()))
             
-            for ticker in settings.STOCK_TICKERS:
-                # Generate realistic price movement (±5% max change)
-                current_price = stock_prices[ticker]
-                change_percent = random.uniform(-0.05, 0.05)  # ±5%
-                new_price = current_price * (1 + change_percent)
-                
-                # Ensure price doesn't go below $1
-                new_price = max(new_price, 1.0)
-                stock_prices[ticker] = new_price
-                
-                # Store price in database
-                db_price = StockPrice(
-                    ticker=ticker,
-                    price=round(new_price, 2),
-                    timestamp=datetime.now()
-                )
-                db.add(db_price)
+            # Queue prices for the ingestion writer (waits only if the writer is saturated)
+            await price_writer.submit_many(tickers, rounded, volumes.tolist(), timestamp)
+            if settings.PRICE_CACHE_SOLE_WRITER:
+                price_cache.add_round(tickers, rounded, timestamp)
+            price_stream.publish_round(tickers, rounded, timestamp)
+            
+            # Only tickers with armed alert rules are evaluated
+            alerts = alert_engine.on_round(stock_prices, timestamp)
+            for alert in alerts:
+                logger.info(f"Alert {alert['rule_id']} for {alert['owner']} triggered: {alert['ticker']} at ${alert['price']:.2f}")
+                price_stream.publish(alert)
+            
+            # Update live moving averages of every ticker at once and publish any crossovers
+            for signal in live_strategy.update_round(tickers, prices, timestamp):
+                logger.info(f"Live {signal.signal} signal for {signal.ticker} at ${signal.price:.2f}")
+                publish_trading_signal(signal)
             
-            db.commit()
-            db.close()
+            # Emit one delta frame per round to compact stream subscribers
+            price_stream.end_round()
             
-            # Wait 1-3 seconds before next update
-            await asyncio.sleep(random.uniform(1, 3))
+            if alerts:
+                async with AsyncSessionLocal() as db:
+                    await mark_triggered(db, alerts)
             
         except Exception as e:
             logger.error(f"Error generating stock prices: {str(e)}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
             await asyncio.sleep(1)
 
+async def prime_price_cache():
+    """Seed the recent-price cache with each simulated ticker's latest stored ticks"""
+    tickers = price_source.tickers
+    # One windowed query per chunk of tickers, keeping the IN list under SQLite's bound parameter limit
+    chunk_size = 500
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(tickers), chunk_size):
+            chunk = tickers[start:start + chunk_size]
+            ranked = select(
+                StockPrice.ticker,
+                StockPrice.price,
+                StockPrice.timestamp,
+                func.row_number().over(
+                    partition_by=StockPrice.ticker, order_by=StockPrice.timestamp.desc()
+                ).label("rank")
+            ).where(StockPrice.ticker.in_(chunk)).subquery()
+            rows = (await db.execute(
+                select(ranked.c.ticker, ranked.c.price, ranked.c.timestamp)
+                .where(ranked.c.rank <= price_cache.depth)
+                .order_by(ranked.c.ticker, ranked.c.timestamp)
+            )).all()
+            
+            history = {ticker: [] for ticker in chunk}
+            for ticker, price, timestamp in rows:
+                history[ticker].append((price, timestamp))
+            for ticker, ticks in history.items():
+                # Fewer rows than the cache depth means the cache now holds the full history,
+                # unless retention may later archive some of those rows
+                complete = len(ticks) < price_cache.depth and settings.STOCK_PRICE_RETENTION_DAYS <= 0
+                price_cache.prime(ticker, ticks, complete=complete)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -72,10 +125,20 @@ async def lifespan(app: FastAPI):
     logger.info("Database tables created successfully")
     
     # Start background tasks
+    if settings.PRICE_CACHE_SOLE_WRITER:
+        await prime_price_cache()
+    async with AsyncSessionLocal() as db:
+        await position_ledger.restore(db)
+        alert_engine.load((await db.scalars(select(AlertRule).where(AlertRule.active))).all())
+    await price_writer.start()
+    await price_stream.start()
     avg_task = asyncio.create_task(calculate_and_store_averages())
     price_task = asyncio.create_task(generate_stock_prices())
     background_tasks.add(avg_task)
     background_tasks.add(price_task)
+    background_tasks.add(asyncio.create_task(run_position_snapshots(position_ledger)))
+    if settings.STOCK_PRICE_RETENTION_DAYS > 0:
+        background_tasks.add(asyncio.create_task(run_stock_price_rotation()))
     logger.info("Background tasks started")
     
     yield
@@ -84,12 +147,18 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down background tasks...")
     for task in background_tasks:
         task.cancel()
+    await price_stream.stop()
+    await price_writer.stop()
+    async with AsyncSessionLocal() as db:
+        await position_ledger.snapshot(db)
+    await async_engine.dispose()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
     title="Trading System API",
     description="A comprehensive trading system with REST API, WebSocket support, and algorithmic trading",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -103,7 +172,7 @@ async def read_root():
         return HTMLResponse(content=f.read())
 
 @app.post("/trade", response_model=TradeResponse)
-async def create_trade(trade: TradeCreate, db: Session = Depends(get_db)):
+async def create_trade(trade: TradeCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new trade"""
     try:
         # Create trade object
@@ -117,90 +186,329 @@ async def create_trade(trade: TradeCreate, db: Session = Depends(get_db)):
         
         # Add to database
         db.add(db_trade)
-        db.commit()
-        db.refresh(db_trade)
+        await db.commit()
+        position_ledger.apply(db_trade.id, db_trade.ticker, db_trade.side, db_trade.price, db_trade.quantity)
+        await db.refresh(db_trade)
         
         logger.info(f"Created trade: {db_trade}")
         return db_trade
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating trade: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error creating trade: {str(e)}")
 
+@app.post("/trades/bulk", response_model=BulkTradeResponse)
+async def create_trades_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Create many trades from a JSON array or an NDJSON stream (application/x-ndjson) in one transaction"""
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        records = iter_ndjson(request.stream())
+    else:
+        try:
+            records = iter_json_array(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    inserter = BulkTradeInserter(db)
+    try:
+        # Invalid rows are reported individually; valid chunks commit together
+        await inserter.add_all(records)
+        await db.commit()
+        
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error creating trades in bulk: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating trades in bulk: {str(e)}")
+    
+    for trade_id, row in inserter.inserted_trades:
+        position_ledger.apply(trade_id, row["ticker"], row["side"], row["price"], row["quantity"])
+    
+    result = inserter.response()
+    logger.info(f"Bulk created {result.inserted} trades ({result.failed} failed)")
+    return result
+
+@app.get("/positions", response_model=List[PositionResponse])
+async def get_positions(ticker: Optional[str] = Query(None, description="Only this ticker's position")):
+    """Current positions from the in-memory ledger, marked to the live simulated prices"""
+    if ticker:
+        position = position_ledger.get(ticker.upper(), stock_prices.get(ticker.upper()))
+        if position is None:
+            raise HTTPException(status_code=404, detail=f"No position in {ticker.upper()}")
+        return [position]
+    return position_ledger.marked(stock_prices)
+
+@app.post("/alerts", response_model=AlertRuleResponse)
+async def create_alert(rule: AlertRuleCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a price alert; it fires once on the live stream and is then deactivated"""
+    try:
+        db_rule = AlertRule(**rule.model_dump(), active=True)
+        db.add(db_rule)
+        await db.commit()
+        await db.refresh(db_rule)
+        
+        alert_engine.add(db_rule)
+        logger.info(f"Created alert: {db_rule}")
+        return db_rule
+        
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error creating alert: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating alert: {str(e)}")
+
+@app.get("/alerts", response_model=List[AlertRuleResponse])
+async def get_alerts(
+    owner: Optional[str] = Query(None, description="Filter by owner"),
+    ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
+    active: Optional[bool] = Query(None, description="Only armed (true) or triggered (false) alerts"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of alerts to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List alert rules, newest first"""
+    query = select(AlertRule)
+    
+    if owner:
+        query = query.where(AlertRule.owner == owner)
+    
+    if ticker:
+        query = query.where(AlertRule.ticker == ticker.upper())
+    
+    if active is not None:
+        query = query.where(AlertRule.active == active)
+    
+    return (await db.scalars(query.order_by(AlertRule.id.desc()).limit(limit))).all()
+
+async def get_alert_or_404(db: AsyncSession, alert_id: int) -> AlertRule:
+    """Load an alert rule or raise 404"""
+    db_rule = await db.get(AlertRule, alert_id)
+    if db_rule is None:
+        raise HTTPException(status_code=404, detail=f"Alert {alert_id} not found")
+    return db_rule
+
+@app.get("/alerts/{alert_id}", response_model=AlertRuleResponse)
+async def get_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get one alert rule"""
+    return await get_alert_or_404(db, alert_id)
+
+@app.put("/alerts/{alert_id}", response_model=AlertRuleResponse)
+async def update_alert(alert_id: int, rule: AlertRuleCreate, db: AsyncSession = Depends(get_async_db)):
+    """Replace an alert rule's definition and re-arm it"""
+    db_rule = await get_alert_or_404(db, alert_id)
+    try:
+        for field, value in rule.model_dump().items():
+            setattr(db_rule, field, value)
+        db_rule.active = True
+        db_rule.triggered_at = None
+        db_rule.triggered_price = None
+        await db.commit()
+        
+        # Re-arming replaces the old thresholds in the index, only once the new definition is stored
+        alert_engine.add(db_rule)
+        logger.info(f"Updated alert: {db_rule}")
+        return db_rule
+        
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error updating alert: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error updating alert: {str(e)}")
+
+@app.delete("/alerts/{alert_id}")
+async def delete_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete an alert rule"""
+    db_rule = await get_alert_or_404(db, alert_id)
+    try:
+        await db.delete(db_rule)
+        await db.commit()
+        
+        alert_engine.remove(alert_id)
+        logger.info(f"Deleted alert: {db_rule}")
+        return {"deleted": alert_id}
+        
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error deleting alert: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error deleting alert: {str(e)}")
+
+# Columns selected for trade and price listings instead of hydrating ORM objects
+TRADE_COLUMNS = (Trade.id, Trade.ticker, Trade.price, Trade.quantity, Trade.side, Trade.timestamp)
+STOCK_PRICE_COLUMNS = (StockPrice.id, StockPrice.ticker, StockPrice.price, StockPrice.volume, StockPrice.timestamp)
+
+def filter_by_ticker_and_time(query, model, ticker: Optional[str], start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Apply the shared ticker and date range filters"""
+    if ticker:
+        query = query.where(model.ticker == ticker.upper())
+    
+    if start_date:
+        query = query.where(model.timestamp >= start_date)
+    
+    if end_date:
+        query = query.where(model.timestamp <= end_date)
+    
+    return query
+
 @app.get("/trades", response_model=List[TradeResponse])
 async def get_trades(
+    response: Response,
     ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
     start_date: Optional[datetime] = Query(None, description="Start date for filtering"),
     end_date: Optional[datetime] = Query(None, description="End date for filtering"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of trades to return"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get trades with optional filtering"""
+    """Get trades with optional filtering, newest first; follow X-Next-Cursor for further pages"""
     try:
-        query = db.query(Trade)
-        
         # Apply filters
-        if ticker:
-            query = query.filter(Trade.ticker == ticker.upper())
+        query = filter_by_ticker_and_time(select(*TRADE_COLUMNS), Trade, ticker, start_date, end_date)
         
-        if start_date:
-            query = query.filter(Trade.timestamp >= start_date)
+        if cursor:
+            query = after_cursor(query, Trade, cursor)
         
-        if end_date:
-            query = query.filter(Trade.timestamp <= end_date)
-        
-        # Order by timestamp descending and limit results
-        trades = query.order_by(Trade.timestamp.desc()).limit(limit).all()
+        # Order by (timestamp, id) descending and limit results
+        rows = (await db.execute(newest_first(query, Trade, limit))).mappings().all()
+        trades, next_cursor = next_page(rows, limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         logger.info(f"Retrieved {len(trades)} trades with filters: ticker={ticker}, start_date={start_date}, end_date={end_date}")
         return trades
-        
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving trades: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving trades: {str(e)}")
 
+@app.get("/trades/export")
+async def export_trades(
+    ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
+    start_date: Optional[datetime] = Query(None, description="Start date for filtering"),
+    end_date: Optional[datetime] = Query(None, description="End date for filtering"),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Export format")
+):
+    """Stream every matching trade, oldest first, as NDJSON or CSV"""
+    query = filter_by_ticker_and_time(select(*TRADE_COLUMNS), Trade, ticker, start_date, end_date)
+    query = query.order_by(Trade.timestamp, Trade.id)
+    
+    return StreamingResponse(
+        stream_export(query, [column.key for column in TRADE_COLUMNS], export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=trades.{export_format}"}
+    )
+
 @app.get("/stock-prices", response_model=List[StockPriceResponse])
 async def get_stock_prices(
+    response: Response,
     ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
+    start_date: Optional[datetime] = Query(None, description="Start date for filtering"),
+    end_date: Optional[datetime] = Query(None, description="End date for filtering"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of prices to return"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get stock prices with optional filtering"""
+    """Get stock prices newest first, served from the recent-price cache when it holds enough ticks"""
+    # Ticks of one round share a timestamp, so only single-ticker pages can use the id-less cache cursors
+    if settings.PRICE_CACHE_SOLE_WRITER and ticker and not (cursor or start_date or end_date):
+        cached = price_cache.get_recent(ticker.upper(), limit + 1)
+        if cached is not None:
+            prices, next_cursor = next_page(cached, limit)
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return prices
+    
     try:
-        query = db.query(StockPrice)
+        query = filter_by_ticker_and_time(select(*STOCK_PRICE_COLUMNS), StockPrice, ticker, start_date, end_date)
         
-        if ticker:
-            query = query.filter(StockPrice.ticker == ticker.upper())
+        if cursor:
+            query = after_cursor(query, StockPrice, cursor)
         
-        prices = query.order_by(StockPrice.timestamp.desc()).limit(limit).all()
+        rows = (await db.execute(newest_first(query, StockPrice, limit))).mappings().all()
+        prices, next_cursor = next_page(rows, limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         logger.info(f"Retrieved {len(prices)} stock prices for ticker: {ticker}")
         return prices
-        
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving stock prices: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving stock prices: {str(e)}")
 
+@app.get("/stock-prices/export")
+async def export_stock_prices(
+    ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
+    start_date: Optional[datetime] = Query(None, description="Start date for filtering"),
+    end_date: Optional[datetime] = Query(None, description="End date for filtering"),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Export format")
+):
+    """Stream every matching stock price, oldest first, as NDJSON or CSV"""
+    query = filter_by_ticker_and_time(select(*STOCK_PRICE_COLUMNS), StockPrice, ticker, start_date, end_date)
+    query = query.order_by(StockPrice.timestamp, StockPrice.id)
+    
+    return StreamingResponse(
+        stream_export(query, [column.key for column in STOCK_PRICE_COLUMNS], export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=stock_prices.{export_format}"}
+    )
+
+@app.get("/candles", response_model=List[CandleResponse])
+async def get_candles(
+    ticker: str = Query(..., description="Ticker symbol"),
+    interval: str = Query("1m", description="Bar interval, e.g. 1s, 1m, 5m, 1h"),
+    start_date: Optional[datetime] = Query(None, description="Earliest bar start to return"),
+    end_date: Optional[datetime] = Query(None, description="Latest bar start to return"),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum number of bars to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get OHLCV bars for a ticker, oldest first, limited to the most recent bars in range"""
+    if interval not in settings.CANDLE_INTERVALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported interval {interval}; available: {', '.join(settings.CANDLE_INTERVALS)}"
+        )
+    
+    try:
+        query = build_candles_query(ticker.upper(), interval, start_date, end_date)
+        candles = (await db.scalars(query.order_by(Candle.bucket_start.desc()).limit(limit))).all()
+        
+        logger.info(f"Retrieved {len(candles)} {interval} candles for ticker: {ticker}")
+        return candles[::-1]
+        
+    except Exception as e:
+        logger.error(f"Error retrieving candles: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving candles: {str(e)}")
+
 @app.get("/average-prices")
 async def get_average_prices(
     ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
+    window: Optional[str] = Query(None, description="Filter by aggregation window, e.g. 1m, 5m, 15m, 1h"),
     limit: int = Query(50, ge=1, le=500, description="Maximum number of averages to return"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get average prices with optional filtering"""
     try:
-        query = db.query(AveragePrice)
+        query = select(AveragePrice)
         
         if ticker:
-            query = query.filter(AveragePrice.ticker == ticker.upper())
+            query = query.where(AveragePrice.ticker == ticker.upper())
         
-        averages = query.order_by(AveragePrice.timestamp.desc()).limit(limit).all()
+        if window:
+            query = query.where(AveragePrice.window == window)
+        
+        averages = (await db.scalars(query.order_by(AveragePrice.timestamp.desc()).limit(limit))).all()
         
         return [
             {
                 "ticker": avg.ticker,
+                "window": avg.window,
                 "average_price": avg.average_price,
+                "open": avg.open_price,
+                "high": avg.high_price,
+                "low": avg.low_price,
+                "close": avg.close_price,
+                "vwap": avg.vwap,
+                "tick_count": avg.tick_count,
                 "timestamp": avg.timestamp
             }
             for avg in averages
@@ -211,115 +519,51 @@ async def get_average_prices(
         raise HTTPException(status_code=500, detail=f"Error retrieving average prices: {str(e)}")
 
 async def calculate_and_store_averages():
-    """Background task to calculate and store average prices every 5 minutes"""
-    from database import SessionLocal
-    
+    """Background task to calculate and store windowed price aggregates every 5 minutes"""
     while True:
         try:
-            db = SessionLocal()
-            current_time = datetime.now()
-            five_minutes_ago = current_time - timedelta(minutes=5)
-            
-            # Calculate averages for each ticker
-            for ticker in settings.STOCK_TICKERS:
-                # Get prices from the last 5 minutes
-                recent_prices = db.query(StockPrice).filter(
-                    and_(
-                        StockPrice.ticker == ticker,
-                        StockPrice.timestamp >= five_minutes_ago
-                    )
-                ).all()
+            async with AsyncSessionLocal() as db:
+                current_time = datetime.now()
                 
-                if recent_prices:
-                    avg_price = sum(price.price for price in recent_prices) / len(recent_prices)
-                    
-                    # Store average price
-                    db_avg = AveragePrice(
-                        ticker=ticker,
-                        average_price=round(avg_price, 2),
-                        timestamp=current_time
-                    )
-                    
-                    db.add(db_avg)
-                    logger.info(f"Calculated average price for {ticker}: ${avg_price:.2f}")
-            
-            db.commit()
-            db.close()
+                # One grouped query computes mean/OHLC/VWAP for every ticker and window
+                rows = await compute_window_aggregates(db, settings.AVERAGE_WINDOWS, current_time)
+                
+                if rows:
+                    await db.execute(insert(AveragePrice), rows)
+                    await db.commit()
+                
+                logger.info(f"Calculated {len(rows)} price aggregates for windows {', '.join(settings.AVERAGE_WINDOWS)}")
             
         except Exception as e:
             logger.error(f"Error calculating averages: {str(e)}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
         
         # Wait 5 minutes before next calculation
         await asyncio.sleep(settings.AVERAGE_CALCULATION_INTERVAL)
 
-
-
-async def generate_stock_prices():
-    """Generate random stock prices and store them in database"""
-    global stock_prices
-    
-    while True:
-        try:
-            db = SessionLocal()
-            
-            for ticker in settings.STOCK_TICKERS:
-                # Generate realistic price movement (±5% max change)
-                current_price = stock_prices[ticker]
-                change_percent = random.uniform(-0.05, 0.05)  # ±5%
-                new_price = current_price * (1 + change_percent)
-                
-                # Ensure price doesn't go below $1
-                new_price = max(new_price, 1.0)
-                stock_prices[ticker] = new_price
-                
-                # Store price in database
-                db_price = StockPrice(
-                    ticker=ticker,
-                    price=round(new_price, 2),
-                    timestamp=datetime.now()
-                )
-                db.add(db_price)
-            
-            db.commit()
-            db.close()
-            
-            # Wait 1-3 seconds before next update
-            await asyncio.sleep(random.uniform(1, 3))
-            
-        except Exception as e:
-            logger.error(f"Error generating stock prices: {str(e)}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
-            await asyncio.sleep(1)
-
 @app.get("/stock-prices/stream")
-async def stream_stock_prices():
-    """Stream real-time stock prices using Server-Sent Events"""
+async def stream_stock_prices(
+    protocol: Literal["json", "compact"] = Query("json", description="json sends every tick; compact sends batched delta frames")
+):
+    """Stream real-time stock prices and trading signals from the shared hub using Server-Sent Events"""
     
     async def generate():
-        while True:
-            try:
-                # Send current stock prices
-                for ticker, price in stock_prices.items():
-                    data = {
-                        "ticker": ticker,
-                        "price": round(price, 2),
-                        "timestamp": datetime.now().isoformat(),
-                        "type": "price_update"
-                    }
-                    yield f"data: {json.dumps(data)}\n\n"
-                
-                # Wait before next update
-                await asyncio.sleep(2)
+        subscription = price_stream.subscribe(protocol)
+        
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.get(), settings.SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Comment frame keeps idle connections and proxies alive
+                    yield b": keep-alive\n\n"
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Error in SSE stream: {str(e)}")
-                yield f"data: {json.dumps({'error': 'Stream error'})}\n\n"
-                break
+                if frame is None:
+                    # The subscriber fell too far behind under the disconnect policy
+                    break
+                yield frame
+        finally:
+            price_stream.unsubscribe(subscription)
     
     return StreamingResponse(
         generate(),
@@ -331,6 +575,18 @@ async def stream_stock_prices():
         }
     )
 
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics for the price ingestion pipeline and caches"""
+    return {
+        "ingestion": price_writer.metrics(),
+        "price_cache": price_cache.metrics(),
+        "stream": price_stream.metrics(),
+        "positions": position_ledger.metrics(),
+        "alerts": alert_engine.metrics(),
+        "simulator": price_source.metrics()
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
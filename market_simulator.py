@@ -0,0 +1,130 @@
+import asyncio
+import random
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+
+# A step model advances every price at once: (prices, initial prices, dt seconds, rng, drift, volatility) -> prices
+StepModel = Callable[[np.ndarray, np.ndarray, float, np.random.Generator, float, float], np.ndarray]
+
+def uniform_step(prices: np.ndarray, initial: np.ndarray, dt: float, rng: np.random.Generator,
+                 drift: float, volatility: float) -> np.ndarray:
+    """Independent uniform jumps of up to ±5% per round (the original simulator); dt is ignored"""
+    return prices * (1 + rng.uniform(-0.05, 0.05, prices.shape[0]))
+
+def gbm_step(prices: np.ndarray, initial: np.ndarray, dt: float, rng: np.random.Generator,
+             drift: float, volatility: float) -> np.ndarray:
+    """Geometric Brownian motion with per-second drift and volatility"""
+    shocks = rng.standard_normal(prices.shape[0])
+    return prices * np.exp((drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * shocks)
+
+def random_walk_step(prices: np.ndarray, initial: np.ndarray, dt: float, rng: np.random.Generator,
+                     drift: float, volatility: float) -> np.ndarray:
+    """Arithmetic random walk whose step size is scaled by each ticker's initial price"""
+    shocks = rng.standard_normal(prices.shape[0])
+    return prices + initial * (drift * dt + volatility * np.sqrt(dt) * shocks)
+
+SIMULATOR_MODELS: Dict[str, StepModel] = {
+    "uniform": uniform_step,
+    "gbm": gbm_step,
+    "random_walk": random_walk_step,
+}
+
+def simulated_universe(tickers: Sequence[str], size: int = 0) -> List[str]:
+    """The given tickers, padded with synthetic SIM00001-style symbols up to size"""
+    universe = list(tickers)
+    universe.extend(f"SIM{i:05d}" for i in range(1, size - len(universe) + 1))
+    return universe
+
+class MarketSimulator:
+    """Vectorized price source that advances every ticker in one NumPy step per round"""
+    
+    MIN_PRICE = 1.0
+    
+    def __init__(self, tickers: Sequence[str], model: str = "uniform", seed: Optional[int] = None,
+                 tick_rate: float = 0, drift: float = 0.0, volatility: float = 0.01):
+        try:
+            self.model = SIMULATOR_MODELS[model.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown simulator model: {model}")
+        
+        self.tickers = list(tickers)
+        self.tick_rate = tick_rate
+        self.drift = drift
+        self.volatility = volatility
+        self.rng = np.random.default_rng(seed)
+        # Pauses of the unpaced (tick_rate 0) mode come from the same seed
+        self._pause_rng = random.Random(seed)
+        
+        self.initial = self.rng.uniform(100, 500, len(self.tickers))
+        self.prices = self.initial.copy()
+        
+        self.rounds_generated = 0
+        self.rounds_late = 0
+    
+    def price_map(self) -> Dict[str, float]:
+        """Current price of every ticker"""
+        return dict(zip(self.tickers, self.prices.tolist()))
+    
+    def delay(self) -> float:
+        """Seconds until the next round: 1/tick_rate, or a random 1-3 s pause when unpaced"""
+        if self.tick_rate > 0:
+            return 1.0 / self.tick_rate
+        return self._pause_rng.uniform(1, 3)
+    
+    def step(self, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Advance every ticker by dt seconds; returns (prices, volumes) arrays in ticker order"""
+        self.prices = np.maximum(
+            self.model(self.prices, self.initial, dt, self.rng, self.drift, self.volatility),
+            self.MIN_PRICE
+        )
+        volumes = self.rng.integers(100, 10001, len(self.tickers))
+        self.rounds_generated += 1
+        return self.prices, volumes
+    
+    async def rounds(self) -> AsyncIterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield one round of (prices, volumes) per tick interval, accounting for the consumer's own time"""
+        loop = asyncio.get_running_loop()
+        deadline = last_step = loop.time()
+        dt = self.delay()
+        elapsed = dt
+        while True:
+            yield self.step(elapsed)
+            
+            deadline += dt
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            else:
+                # Consumers that fall behind get the next round immediately rather than a catch-up burst
+                self.rounds_late += 1
+                deadline = loop.time()
+                await asyncio.sleep(0)
+            dt = self.delay()
+            
+            # Time-scaled models advance by the time that actually passed, so late rounds keep their variance
+            now = loop.time()
+            elapsed, last_step = now - last_step, now
+    
+    def metrics(self) -> Dict:
+        """Simulator counters for monitoring"""
+        return {
+            "tickers": len(self.tickers),
+            "tick_rate": self.tick_rate,
+            "rounds_generated": self.rounds_generated,
+            "rounds_late": self.rounds_late
+        }
+
+def create_price_source(tickers: Sequence[str] = None) -> MarketSimulator:
+    """Market simulator configured from settings, shared by the API and the WebSocket server"""
+    universe = simulated_universe(settings.STOCK_TICKERS if tickers is None else tickers, settings.SIMULATOR_UNIVERSE_SIZE)
+    return MarketSimulator(
+        universe,
+        model=settings.SIMULATOR_MODEL,
+        seed=settings.SIMULATOR_SEED,
+        tick_rate=settings.SIMULATOR_TICK_RATE,
+        drift=settings.SIMULATOR_DRIFT,
+        volatility=settings.SIMULATOR_VOLATILITY
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, Index, Boolean
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -17,6 +17,11 @@ class Trade(Base):
     side = Column(Enum(TradeType), nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
+    __table_args__ = (
+        Index("ix_trades_ticker_timestamp", ticker, timestamp.desc()),
+        Index("ix_trades_timestamp", timestamp.desc()),
+    )
+    
     def __repr__(self):
         return f"<Trade(ticker={self.ticker}, price={self.price}, quantity={self.quantity}, side={self.side})>"
 
@@ -26,8 +31,14 @@ class StockPrice(Base):
     id = Column(Integer, primary_key=True, index=True)
     ticker = Column(String(10), nullable=False, index=True)
     price = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=True)  # shares traded on this tick; NULL counts as 1 for VWAP
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
+    __table_args__ = (
+        Index("ix_stock_prices_ticker_timestamp", ticker, timestamp.desc()),
+        Index("ix_stock_prices_timestamp", timestamp.desc()),
+    )
+    
     def __repr__(self):
         return f"<StockPrice(ticker={self.ticker}, price={self.price}, timestamp={self.timestamp})>"
 
@@ -37,7 +48,86 @@ class AveragePrice(Base):
     id = Column(Integer, primary_key=True, index=True)
     ticker = Column(String(10), nullable=False, index=True)
     average_price = Column(Float, nullable=False)
+    window = Column(String(8), nullable=True)  # e.g. "1m", "5m"; NULL on rows written before windows existed
+    open_price = Column(Float, nullable=True)
+    high_price = Column(Float, nullable=True)
+    low_price = Column(Float, nullable=True)
+    close_price = Column(Float, nullable=True)
+    vwap = Column(Float, nullable=True)
+    tick_count = Column(Integer, nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
+    __table_args__ = (
+        Index("ix_average_prices_ticker_timestamp", ticker, timestamp.desc()),
+    )
+    
+    def __repr__(self):
+        return f"<AveragePrice(ticker={self.ticker}, window={self.window}, average_price={self.average_price}, timestamp={self.timestamp})>"
+
+class Candle(Base):
+    __tablename__ = "candles"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    ticker = Column(String(10), nullable=False)
+    interval = Column(String(8), nullable=False)  # e.g. "1s", "1m", "5m", "1h"
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    open_price = Column(Float, nullable=False)
+    high_price = Column(Float, nullable=False)
+    low_price = Column(Float, nullable=False)
+    close_price = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=False, default=0)
+    tick_count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # One bar per bucket; also serves (ticker, interval) range scans ordered by time
+        Index("ux_candles_ticker_interval_bucket", ticker, interval, bucket_start, unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<Candle(ticker={self.ticker}, interval={self.interval}, bucket_start={self.bucket_start}, close={self.close_price})>"
+
+class PositionSnapshot(Base):
+    __tablename__ = "position_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    ticker = Column(String(10), nullable=False)
+    quantity = Column(Integer, nullable=False)  # negative when short
+    average_cost = Column(Float, nullable=False)
+    realized_pnl = Column(Float, nullable=False)
+    last_trade_id = Column(Integer, nullable=False, index=True)  # trades up to this id are included
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<PositionSnapshot(ticker={self.ticker}, quantity={self.quantity}, last_trade_id={self.last_trade_id})>"
+
+class PositionSnapshotGap(Base):
+    __tablename__ = "position_snapshot_gaps"
+    
+    # Trade ids at or below the snapshot's last_trade_id that it does not include (uncommitted when taken)
+    trade_id = Column(Integer, primary_key=True)
+    
+    def __repr__(self):
+        return f"<PositionSnapshotGap(trade_id={self.trade_id})>"
+
+class AlertRule(Base):
+    __tablename__ = "alert_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner = Column(String(64), nullable=False, index=True)
+    ticker = Column(String(10), nullable=False)
+    kind = Column(String(8), nullable=False)  # "cross" or "move"
+    direction = Column(String(8), nullable=False)  # "up" or "down"
+    level = Column(Float, nullable=True)  # price level of cross rules
+    percent = Column(Float, nullable=True)  # size of the move, in percent, of move rules
+    window_seconds = Column(Float, nullable=True)  # look-back window of move rules
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_price = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_alert_rules_active_ticker", active, ticker),
+    )
+    
     def __repr__(self):
-        return f"<AveragePrice(ticker={self.ticker}, average_price={self.average_price}, timestamp={self.timestamp})>"
+        return f"<AlertRule(owner={self.owner}, ticker={self.ticker}, kind={self.kind}, direction={self.direction})>"
@@ -0,0 +1,85 @@
+import base64
+import csv
+import enum
+import io
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+from config import settings
+from database import AsyncSessionLocal
+from serialization import json_dumps_bytes
+
+# Export formats and their media types
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def encode_cursor(timestamp: datetime, row_id: Optional[int]) -> str:
+    """Opaque cursor for the position just after a (timestamp, id) row"""
+    raw = f"{timestamp.isoformat()}|{'' if row_id is None else row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Optional[int]]:
+    """Parse a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id) if row_id else None
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def after_cursor(query, model, cursor: str):
+    """Restrict a newest-first (timestamp, id) query to rows after the cursor position"""
+    timestamp, row_id = decode_cursor(cursor)
+    if row_id is None:
+        # Cursors from cache-served pages carry no id; they resume strictly before the timestamp
+        return query.where(model.timestamp < timestamp)
+    return query.where(or_(
+        model.timestamp < timestamp,
+        and_(model.timestamp == timestamp, model.id < row_id)
+    ))
+
+def newest_first(query, model, limit: int):
+    """Order by (timestamp, id) descending and fetch one extra row to detect a further page"""
+    return query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1)
+
+def next_page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    """Trim the look-ahead row and return the page with the cursor of the following page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last["timestamp"], last.get("id"))
+
+def _export_value(value):
+    """Plain CSV representation of a column value"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def stream_export(query, columns: Sequence[str], export_format: str) -> AsyncIterator[bytes]:
+    """Stream query rows as NDJSON or CSV using a server-side cursor and a session owned by the stream"""
+    batch_size = settings.EXPORT_BATCH_SIZE
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            async for rows in result.partitions():
+                writer.writerows([_export_value(value) for value in row] for row in rows)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            async for rows in result.partitions():
+                yield b"".join(json_dumps_bytes(dict(zip(columns, row))) + b"\n" for row in rows)
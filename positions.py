@@ -0,0 +1,266 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Set
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models import PositionSnapshot, PositionSnapshotGap, Trade, TradeType
+from utils import logger
+
+class Position:
+    """Signed quantity (negative when short), average cost of the open quantity and realized P&L of one ticker"""
+    
+    __slots__ = ("ticker", "quantity", "average_cost", "realized_pnl")
+    
+    def __init__(self, ticker: str, quantity: int = 0, average_cost: float = 0.0, realized_pnl: float = 0.0):
+        self.ticker = ticker
+        self.quantity = quantity
+        self.average_cost = average_cost
+        self.realized_pnl = realized_pnl
+    
+    def apply(self, side: TradeType, price: float, quantity: int):
+        """Fold one fill into the position using average-cost accounting"""
+        signed = quantity if side == TradeType.BUY else -quantity
+        
+        if self.quantity == 0 or (self.quantity > 0) == (signed > 0):
+            # Opening or adding: the average cost moves towards the fill price
+            open_quantity = abs(self.quantity)
+            self.average_cost = (self.average_cost * open_quantity + price * quantity) / (open_quantity + quantity)
+            self.quantity += signed
+            return
+        
+        # Reducing: the closed part realizes against the average cost, any excess opens the other way
+        closed = min(quantity, abs(self.quantity))
+        direction = 1 if self.quantity > 0 else -1
+        self.realized_pnl += closed * (price - self.average_cost) * direction
+        self.quantity += signed
+        if self.quantity == 0:
+            self.average_cost = 0.0
+        elif quantity > closed:
+            self.average_cost = price
+    
+    def to_dict(self, market_price: Optional[float] = None) -> Dict:
+        """Position with unrealized P&L marked to market_price when one is known"""
+        market_value = unrealized_pnl = None
+        if market_price is not None:
+            market_value = self.quantity * market_price
+            unrealized_pnl = self.quantity * (market_price - self.average_cost)
+        return {
+            "ticker": self.ticker,
+            "quantity": self.quantity,
+            "average_cost": self.average_cost,
+            "realized_pnl": self.realized_pnl,
+            "market_price": market_price,
+            "market_value": market_value,
+            "unrealized_pnl": unrealized_pnl
+        }
+
+# Snapshots after which an id that never committed is treated as rolled back, and a trade folded in
+# from the database during a snapshot stops waiting for its own request to report it
+STALE_SNAPSHOTS = 10
+
+class PositionLedger:
+    """In-memory positions updated in O(1) per trade and periodically snapshotted to the database"""
+    
+    def __init__(self):
+        self.positions: Dict[str, Position] = {}
+        # Every committed trade up to last_trade_id is folded in except the ids in gaps (id -> snapshots seen)
+        self.last_trade_id = 0
+        self.gaps: Dict[int, int] = {}
+        self._above: Set[int] = set()  # ids above last_trade_id already folded in
+        self._reconciled: Dict[int, int] = {}  # ids folded in from the database before their request applied them
+        self.dirty = False
+        
+        self.trades_applied = 0
+        self.trades_reconciled = 0
+        self.snapshots_written = 0
+    
+    def apply(self, trade_id: int, ticker: str, side: TradeType, price: float, quantity: int) -> bool:
+        """Fold a committed trade into its ticker's position; False if it was already folded in"""
+        if self._reconciled.pop(trade_id, None) is not None:
+            return False
+        self._fold(trade_id, ticker, side, price, quantity)
+        return True
+    
+    def _fold(self, trade_id: int, ticker: str, side: TradeType, price: float, quantity: int):
+        """Update the position and record that trade_id is included"""
+        position = self.positions.get(ticker)
+        if position is None:
+            position = self.positions[ticker] = Position(ticker)
+        position.apply(side, price, quantity)
+        
+        if trade_id > self.last_trade_id:
+            self._above.add(trade_id)
+        else:
+            self.gaps.pop(trade_id, None)
+        self.dirty = True
+        self.trades_applied += 1
+    
+    def _included(self, trade_id: int) -> bool:
+        """Whether a trade is already folded into the positions"""
+        if trade_id > self.last_trade_id:
+            return trade_id in self._above
+        return trade_id not in self.gaps
+    
+    def get(self, ticker: str, market_price: Optional[float] = None) -> Optional[Dict]:
+        """One ticker's position marked to market_price, or None if it never traded"""
+        position = self.positions.get(ticker)
+        return position.to_dict(market_price) if position else None
+    
+    def marked(self, prices: Mapping[str, float]) -> List[Dict]:
+        """Every position with unrealized P&L marked to the given live prices"""
+        return [
+            position.to_dict(prices.get(ticker))
+            for ticker, position in sorted(self.positions.items())
+        ]
+    
+    async def _committed_trades(self, db: AsyncSession, ids: List[int]):
+        """Committed trades among the given ids, in id order"""
+        # Chunked to keep the IN list under SQLite's bound parameter limit
+        chunk_size = 500
+        rows = []
+        for start in range(0, len(ids), chunk_size):
+            rows.extend((await db.execute(
+                select(Trade.id, Trade.ticker, Trade.side, Trade.price, Trade.quantity)
+                .where(Trade.id.in_(ids[start:start + chunk_size]))
+            )).all())
+        return sorted(rows)
+    
+    async def restore(self, db: AsyncSession):
+        """Load the latest snapshot and replay only the trades it does not include"""
+        self.positions.clear()
+        self.gaps.clear()
+        self._above.clear()
+        self._reconciled.clear()
+        self.last_trade_id = 0
+        
+        watermark = (await db.execute(select(func.max(PositionSnapshot.last_trade_id)))).scalar()
+        gaps = []
+        if watermark is not None:
+            snapshots = (await db.scalars(
+                select(PositionSnapshot).where(PositionSnapshot.last_trade_id == watermark)
+            )).all()
+            for snapshot in snapshots:
+                self.positions[snapshot.ticker] = Position(
+                    snapshot.ticker, snapshot.quantity, snapshot.average_cost, snapshot.realized_pnl
+                )
+            self.last_trade_id = watermark
+            gaps = (await db.scalars(select(PositionSnapshotGap.trade_id))).all()
+        
+        # Trades that were uncommitted when the snapshot was taken but committed since
+        replayed = 0
+        for trade_id, ticker, side, price, quantity in await self._committed_trades(db, list(gaps)):
+            self._fold(trade_id, ticker, side, price, quantity)
+            replayed += 1
+        
+        result = await db.stream(
+            select(Trade.id, Trade.ticker, Trade.side, Trade.price, Trade.quantity)
+            .where(Trade.id > self.last_trade_id)
+            .order_by(Trade.id)
+            .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for trade_id, ticker, side, price, quantity in result:
+            self._fold(trade_id, ticker, side, price, quantity)
+            replayed += 1
+        
+        # No other transaction can still commit a lower id once this process restarted
+        self.last_trade_id = max(self._above, default=self.last_trade_id)
+        self._above.clear()
+        
+        # Replayed trades are not in the snapshot yet
+        self.dirty = replayed > 0
+        logger.info(f"Restored {len(self.positions)} positions (snapshot through trade {watermark or 0}, {replayed} trades replayed)")
+    
+    async def _reconcile(self, db: AsyncSession) -> int:
+        """Fold in committed trades the ledger missed and return the highest committed trade id"""
+        committed = (await db.scalars(
+            select(Trade.id).where(or_(Trade.id > self.last_trade_id, Trade.id.in_(list(self.gaps))))
+        )).all()
+        missing = [trade_id for trade_id in committed if not self._included(trade_id)]
+        
+        for trade_id, ticker, side, price, quantity in await self._committed_trades(db, missing):
+            # Requests may have applied some of them while the rows were being read
+            if not self._included(trade_id):
+                self._fold(trade_id, ticker, side, price, quantity)
+                self._reconciled[trade_id] = 0
+                self.trades_reconciled += 1
+        return max(committed, default=self.last_trade_id)
+    
+    def _advance(self, watermark: int):
+        """Move last_trade_id up to watermark, recording every id below it that is not folded in as a gap"""
+        for trade_id in list(self.gaps):
+            self.gaps[trade_id] += 1
+            if self.gaps[trade_id] > STALE_SNAPSHOTS:
+                del self.gaps[trade_id]
+        for trade_id in list(self._reconciled):
+            self._reconciled[trade_id] += 1
+            if self._reconciled[trade_id] > STALE_SNAPSHOTS:
+                del self._reconciled[trade_id]
+        
+        for trade_id in range(self.last_trade_id + 1, watermark + 1):
+            if trade_id not in self._above:
+                self.gaps[trade_id] = 0
+        self._above = {trade_id for trade_id in self._above if trade_id > watermark}
+        self.last_trade_id = max(self.last_trade_id, watermark)
+    
+    async def snapshot(self, db: AsyncSession) -> bool:
+        """Replace the stored snapshot with the current positions if they changed"""
+        if not self.dirty:
+            return False
+        
+        # The watermark comes from the database, so trades still uncommitted below it are kept as gaps
+        self._advance(await self._reconcile(db))
+        
+        taken_at = datetime.now()
+        rows = [
+            {
+                "ticker": position.ticker,
+                "quantity": position.quantity,
+                "average_cost": position.average_cost,
+                "realized_pnl": position.realized_pnl,
+                "last_trade_id": self.last_trade_id,
+                "timestamp": taken_at
+            }
+            for position in self.positions.values()
+        ]
+        gaps = [{"trade_id": trade_id} for trade_id in self.gaps]
+        self.dirty = False
+        
+        try:
+            await db.execute(delete(PositionSnapshot))
+            if rows:
+                await db.execute(insert(PositionSnapshot), rows)
+            await db.execute(delete(PositionSnapshotGap))
+            if gaps:
+                await db.execute(insert(PositionSnapshotGap), gaps)
+            await db.commit()
+        except Exception:
+            self.dirty = True
+            raise
+        
+        self.snapshots_written += 1
+        return True
+    
+    def metrics(self) -> Dict:
+        """Ledger counters for monitoring"""
+        return {
+            "positions": len(self.positions),
+            "last_trade_id": self.last_trade_id,
+            "gaps": len(self.gaps),
+            "trades_applied": self.trades_applied,
+            "trades_reconciled": self.trades_reconciled,
+            "snapshots_written": self.snapshots_written
+        }
+
+async def run_position_snapshots(ledger: PositionLedger):
+    """Background task that periodically persists the ledger so restarts replay only recent trades"""
+    while True:
+        await asyncio.sleep(settings.POSITION_SNAPSHOT_INTERVAL)
+        try:
+            async with AsyncSessionLocal() as db:
+                await ledger.snapshot(db)
+        except Exception as e:
+            logger.error(f"Error writing position snapshot: {str(e)}")
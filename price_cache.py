@@ -0,0 +1,87 @@
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+class _TickerTicks:
+    """Most recent ticks of one ticker, newest last"""
+    __slots__ = ("ticks", "complete")
+    
+    def __init__(self, depth: int):
+        self.ticks: deque = deque(maxlen=depth)
+        self.complete = False  # True when the deque holds the ticker's entire stored history
+
+class RecentPriceCache:
+    """Bounded per-ticker cache of this process's latest ticks, answering single-ticker queries without SQL"""
+    
+    def __init__(self, depth: int = None, max_tickers: int = None):
+        self.depth = depth or settings.PRICE_CACHE_DEPTH
+        self.max_tickers = max_tickers or settings.PRICE_CACHE_MAX_TICKERS
+        self._tickers: "OrderedDict[str, _TickerTicks]" = OrderedDict()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _entry(self, ticker: str) -> _TickerTicks:
+        """Get or create a ticker's entry, evicting the least recently updated ticker when full"""
+        entry = self._tickers.get(ticker)
+        if entry is None:
+            entry = self._tickers[ticker] = _TickerTicks(self.depth)
+            if len(self._tickers) > self.max_tickers:
+                self._tickers.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._tickers.move_to_end(ticker)
+        return entry
+    
+    def add_round(self, tickers: Iterable[str], prices: Iterable[float], timestamp: datetime):
+        """Record one tick per ticker sharing a timestamp"""
+        # _entry inlined for the common case of a ticker that is already cached
+        cached = self._tickers
+        for ticker, price in zip(tickers, prices):
+            entry = cached.get(ticker)
+            if entry is None:
+                entry = self._entry(ticker)
+            else:
+                cached.move_to_end(ticker)
+            entry.ticks.append((price, timestamp))
+    
+    def prime(self, ticker: str, ticks: Iterable[Tuple[float, datetime]], complete: bool):
+        """Seed a ticker from stored history (oldest first); complete means nothing older exists"""
+        entry = self._entry(ticker)
+        ticks = list(ticks)
+        room = self.depth - len(entry.ticks)
+        # Older ticks go in front of anything already cached, never displacing newer ones
+        entry.ticks.extendleft(reversed(ticks[len(ticks) - room:] if room > 0 else []))
+        entry.complete = complete and room >= len(ticks)
+    
+    def _covers(self, entry: Optional[_TickerTicks], limit: int) -> bool:
+        """Whether an entry alone can answer a query for its newest limit ticks"""
+        return entry is not None and (entry.complete or len(entry.ticks) >= limit)
+    
+    def get_recent(self, ticker: str, limit: int) -> Optional[List[Dict]]:
+        """Newest-first ticks of one ticker, or None when the DB must be queried"""
+        entry = self._tickers.get(ticker)
+        if not self._covers(entry, limit):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [
+            {"ticker": ticker, "price": price, "timestamp": timestamp}
+            for price, timestamp in islice(reversed(entry.ticks), limit)
+        ]
+    
+    def metrics(self) -> Dict:
+        """Cache counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "tickers": len(self._tickers),
+            "cached_ticks": sum(len(entry.ticks) for entry in self._tickers.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
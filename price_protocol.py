@@ -0,0 +1,156 @@
+import struct
+import time
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from config import settings
+from serialization import json_dumps
+
+# "json" is the original one-object-per-tick stream; "compact" sends batched delta frames as JSON
+# and "binary" sends the same frames in the fixed struct layout below
+STREAM_PROTOCOLS = ("json", "compact", "binary")
+
+# Binary delta frame: header (version, frame kind, entry count, base epoch ms) followed by one
+# entry per changed ticker (interned ticker index, price in cents, ms after the base timestamp)
+PROTOCOL_VERSION = 1
+FRAME_DELTA = 1
+_HEADER = struct.Struct("<BBHq")
+_ENTRY = struct.Struct("<HiI")
+# Ticker indexes and the entry count are uint16, so a frame holding every ticker must stay below this
+MAX_TICKERS = 0xFFFF
+
+# (ticker index, price, epoch ms)
+DeltaEntry = Tuple[int, float, int]
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    """Convert a datetime to integer milliseconds since the epoch"""
+    return int(timestamp.timestamp() * 1000)
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    """Convert milliseconds since the epoch to a local datetime"""
+    return datetime.fromtimestamp(epoch_ms / 1000)
+
+class TickerTable:
+    """Interned ticker symbols; an index never changes once assigned"""
+    
+    def __init__(self, tickers: Iterable[str] = ()):
+        self.symbols: List[str] = []
+        self.indexes: Dict[str, int] = {}
+        for ticker in tickers:
+            self.intern(ticker)
+    
+    def intern(self, ticker: str) -> int:
+        """Index of a ticker, assigning the next free index to new tickers"""
+        index = self.indexes.get(ticker)
+        if index is None:
+            if len(self.symbols) >= MAX_TICKERS:
+                raise ValueError(f"Cannot intern {ticker!r}: the delta protocols support at most {MAX_TICKERS} tickers")
+            index = self.indexes[ticker] = len(self.symbols)
+            self.symbols.append(ticker)
+        return index
+    
+    def symbols_message(self) -> dict:
+        """Message that tells clients which ticker each index stands for"""
+        return {"type": "symbols", "symbols": list(self.symbols)}
+
+class DeltaFrameBuilder:
+    """Collect ticks between frames and emit only the tickers whose price changed"""
+    
+    def __init__(self, tickers: TickerTable, keyframe_interval: float = None):
+        self.tickers = tickers
+        self.keyframe_interval = settings.DELTA_KEYFRAME_INTERVAL if keyframe_interval is None else keyframe_interval
+        self._last_keyframe = time.monotonic()
+        self.symbols_changed = False
+        self._latest: Dict[int, DeltaEntry] = {}
+        self._published: Dict[int, float] = {}  # last price sent per ticker index
+        self._pending: Dict[int, DeltaEntry] = {}
+        # Interned indexes of the last ticker sequence passed to add_many, reused while it is the same list
+        self._round_tickers: Optional[Sequence[str]] = None
+        self._round_indexes: List[int] = []
+    
+    def add(self, ticker: str, price: float, timestamp: datetime):
+        """Record a tick for the next frame"""
+        known = len(self.tickers.symbols)
+        index = self.tickers.intern(ticker)
+        self.symbols_changed |= len(self.tickers.symbols) != known
+        
+        entry = (index, round(price, 2), to_epoch_ms(timestamp))
+        self._latest[index] = entry
+        self._pending[index] = entry
+    
+    def add_many(self, tickers: Sequence[str], prices: Iterable[float], timestamp: datetime):
+        """Record a round of ticks sharing one timestamp for the next frame (prices already rounded to cents)"""
+        if tickers is not self._round_tickers:
+            known = len(self.tickers.symbols)
+            self._round_indexes = [self.tickers.intern(ticker) for ticker in tickers]
+            self._round_tickers = tickers
+            self.symbols_changed |= len(self.tickers.symbols) != known
+        
+        entries = list(zip(self._round_indexes, prices, repeat(to_epoch_ms(timestamp))))
+        self._latest.update(zip(self._round_indexes, entries))
+        self._pending.update(zip(self._round_indexes, entries))
+    
+    def flush(self) -> List[DeltaEntry]:
+        """Entries whose price moved since the previous frame, or every ticker when a keyframe is due"""
+        now = time.monotonic()
+        if self.keyframe_interval > 0 and now - self._last_keyframe >= self.keyframe_interval:
+            # Queues may drop or conflate delta frames; a periodic full frame brings those clients back in sync
+            self._last_keyframe = now
+            entries = self.snapshot()
+        else:
+            entries = [
+                entry for index, entry in sorted(self._pending.items())
+                if self._published.get(index) != entry[1]
+            ]
+        self._pending.clear()
+        for index, price, _ in entries:
+            self._published[index] = price
+        return entries
+    
+    def snapshot(self) -> List[DeltaEntry]:
+        """Latest entry of every ticker, for priming new subscribers"""
+        return [entry for _, entry in sorted(self._latest.items())]
+
+def select_entries(entries: List[DeltaEntry], indexes: Optional[Iterable[int]]) -> List[DeltaEntry]:
+    """Restrict entries to a set of ticker indexes (None keeps every entry)"""
+    if indexes is None:
+        return entries
+    indexes = set(indexes)
+    return [entry for entry in entries if entry[0] in indexes]
+
+def delta_message(entries: List[DeltaEntry]) -> dict:
+    """Compact JSON delta frame: a base timestamp plus [index, price, ms offset] per entry"""
+    base = min(entry[2] for entry in entries)
+    return {"type": "delta", "ts": base, "u": [[index, price, ts - base] for index, price, ts in entries]}
+
+def encode_delta_binary(entries: List[DeltaEntry]) -> bytes:
+    """Pack a delta frame into the fixed little-endian struct layout"""
+    base = min(entry[2] for entry in entries)
+    buffer = bytearray(_HEADER.size + _ENTRY.size * len(entries))
+    _HEADER.pack_into(buffer, 0, PROTOCOL_VERSION, FRAME_DELTA, len(entries), base)
+    for position, (index, price, ts) in enumerate(entries):
+        _ENTRY.pack_into(buffer, _HEADER.size + position * _ENTRY.size, index, round(price * 100), ts - base)
+    return bytes(buffer)
+
+def decode_delta_binary(frame: bytes) -> dict:
+    """Unpack a binary delta frame into the same shape as delta_message"""
+    version, kind, count, base = _HEADER.unpack_from(frame, 0)
+    if version != PROTOCOL_VERSION or kind != FRAME_DELTA:
+        raise ValueError(f"Unsupported binary frame (version={version}, kind={kind})")
+    updates = [
+        [index, cents / 100, offset]
+        for index, cents, offset in _ENTRY.iter_unpack(frame[_HEADER.size:_HEADER.size + count * _ENTRY.size])
+    ]
+    return {"type": "delta", "ts": base, "u": updates}
+
+def encode_delta(entries: List[DeltaEntry], protocol: str) -> Union[str, bytes]:
+    """Encode a delta frame for a compact protocol"""
+    if protocol == "binary":
+        return encode_delta_binary(entries)
+    return json_dumps(delta_message(entries))
+
+def expand_delta(message: dict, symbols: List[str]) -> List[Tuple[str, float, datetime]]:
+    """(ticker, price, timestamp) updates carried by a decoded delta frame"""
+    base = message["ts"]
+    return [(symbols[index], price, from_epoch_ms(base + offset)) for index, price, offset in message["u"]]
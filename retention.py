@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select
+
+from config import settings
+from database import engine
+from models import StockPrice
+from utils import logger
+
+def _month_start(moment: datetime) -> datetime:
+    """First instant of the calendar month containing moment"""
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _next_month(moment: datetime) -> datetime:
+    """First instant of the following calendar month"""
+    return (_month_start(moment) + timedelta(days=32)).replace(day=1)
+
+def archive_table(month: datetime) -> Table:
+    """Monthly archive table with the same columns as stock_prices, e.g. stock_prices_202401"""
+    name = f"{StockPrice.__tablename__}_{month:%Y%m}"
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in StockPrice.__table__.columns
+    ]
+    return Table(
+        name,
+        MetaData(),
+        *columns,
+        Index(f"ix_{name}_ticker_timestamp", "ticker", "timestamp")
+    )
+
+def rotate_stock_prices(retention_days: int = None, bind=None) -> List[str]:
+    """Move stock_prices rows older than the retention window into monthly archive tables"""
+    retention_days = settings.STOCK_PRICE_RETENTION_DAYS if retention_days is None else retention_days
+    bind = bind or engine
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    prices = StockPrice.__table__
+    rotated = []
+    
+    with bind.begin() as conn:
+        lower = None
+        while True:
+            # Jump straight to the next month that actually has rows to rotate
+            pending = prices.c.timestamp < cutoff
+            if lower is not None:
+                pending &= prices.c.timestamp >= lower
+            oldest = conn.execute(select(func.min(prices.c.timestamp)).where(pending)).scalar()
+            if oldest is None:
+                break
+            
+            month = _month_start(oldest.replace(tzinfo=None))
+            lower = min(_next_month(month), cutoff)
+            archive = archive_table(month)
+            archive.create(bind=conn, checkfirst=True)
+            
+            in_month = (prices.c.timestamp >= month) & (prices.c.timestamp < lower)
+            moved = conn.execute(
+                insert(archive).from_select(
+                    [column.name for column in prices.columns],
+                    select(*prices.columns).where(in_month)
+                )
+            ).rowcount
+            conn.execute(delete(prices).where(in_month))
+            
+            rotated.append(archive.name)
+            logger.info(f"Rotated {moved} stock prices into {archive.name}")
+    
+    return rotated
+
+async def run_stock_price_rotation():
+    """Background task that periodically rotates old stock prices out of the hot table"""
+    while True:
+        try:
+            await asyncio.to_thread(rotate_stock_prices)
+        except Exception as e:
+            logger.error(f"Error rotating stock prices: {str(e)}")
+        
+        await asyncio.sleep(settings.STOCK_PRICE_ROTATION_INTERVAL)
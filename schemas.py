@@ -1,6 +1,6 @@
-from pydantic import BaseModel, validator, Field
+from pydantic import BaseModel, validator, model_validator, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 from models import TradeType
 
 class TradeCreate(BaseModel):
@@ -37,6 +37,25 @@ class TradeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkTradeError(BaseModel):
+    index: int  # position of the trade in the request body
+    detail: str
+
+class BulkTradeResponse(BaseModel):
+    inserted: int
+    failed: int
+    ids: List[Optional[int]]  # id of each trade in request order, null where it failed
+    errors: List[BulkTradeError]
+
+class PositionResponse(BaseModel):
+    ticker: str
+    quantity: int  # negative when short
+    average_cost: float
+    realized_pnl: float
+    market_price: Optional[float] = None  # live simulated price used to mark the position
+    market_value: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+
 class TradeFilter(BaseModel):
     ticker: Optional[str] = None
     start_date: Optional[datetime] = None
@@ -50,6 +69,58 @@ class StockPriceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CandleResponse(BaseModel):
+    ticker: str
+    interval: str
+    bucket_start: datetime
+    open: float = Field(..., validation_alias="open_price")
+    high: float = Field(..., validation_alias="high_price")
+    low: float = Field(..., validation_alias="low_price")
+    close: float = Field(..., validation_alias="close_price")
+    volume: int
+    tick_count: int
+    
+    class Config:
+        from_attributes = True
+
+class AlertRuleCreate(BaseModel):
+    owner: str = Field(..., min_length=1, max_length=64, description="User the alert belongs to")
+    ticker: str = Field(..., min_length=1, max_length=10, description="Stock ticker symbol")
+    kind: Literal["cross", "move"] = Field(..., description="cross: price crosses level; move: percent move within window_seconds")
+    direction: Literal["up", "down"] = Field(..., description="Upward or downward cross/move")
+    level: Optional[float] = Field(None, gt=0, description="Price level of a cross alert")
+    percent: Optional[float] = Field(None, gt=0, description="Size of the move of a move alert, in percent (2.0 = 2%)")
+    window_seconds: float = Field(60, gt=0, description="Look-back window of a move alert")
+    
+    @validator('ticker')
+    def ticker_must_be_uppercase(cls, v):
+        return v.upper().strip()
+    
+    @model_validator(mode="after")
+    def threshold_matches_kind(self):
+        if self.kind == "cross" and self.level is None:
+            raise ValueError('Cross alerts need a level')
+        if self.kind == "move" and self.percent is None:
+            raise ValueError('Move alerts need a percent')
+        return self
+
+class AlertRuleResponse(BaseModel):
+    id: int
+    owner: str
+    ticker: str
+    kind: str
+    direction: str
+    level: Optional[float] = None
+    percent: Optional[float] = None
+    window_seconds: Optional[float] = None
+    active: bool
+    created_at: datetime
+    triggered_at: Optional[datetime] = None
+    triggered_price: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
+
 class TradingSignal(BaseModel):
     ticker: str
     signal: str  # "BUY" or "SELL"
@@ -65,4 +136,5 @@ class ProfitLossReport(BaseModel):
     winning_trades: int
     losing_trades: int
     win_rate: float
+    max_drawdown: float = 0.0
     signals: List[TradingSignal]
@@ -0,0 +1,102 @@
+import asyncio
+from collections import deque
+from typing import Dict, Hashable, Optional
+
+from config import settings
+
+# drop_oldest discards the oldest queued message when full; conflate first replaces a queued
+# message with the same key (e.g. a ticker's pending price); disconnect drops the connection
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "conflate", "disconnect")
+
+class SendQueueStats:
+    """Counters shared by every send queue of one server"""
+    
+    def __init__(self):
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.disconnected = 0
+    
+    def metrics(self) -> Dict:
+        """Queue counters for monitoring"""
+        return {
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "disconnected": self.disconnected
+        }
+
+class ClientSendQueue:
+    """Bounded outbound message queue for one connection with a slow-consumer policy"""
+    
+    def __init__(self, maxsize: int = None, policy: str = None, stats: SendQueueStats = None):
+        self.maxsize = maxsize or settings.CLIENT_QUEUE_SIZE
+        self.policy = policy or settings.CLIENT_QUEUE_POLICY
+        if self.policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {self.policy}")
+        self.stats = stats or SendQueueStats()
+        
+        self._items: deque = deque()
+        self._latest: Dict[Hashable, list] = {}  # conflation key -> queued [key, message]
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.overflowed = False
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def put(self, message, key: Optional[Hashable] = None) -> bool:
+        """Queue a message; returns False if the connection should be dropped"""
+        if self.closed:
+            return False
+        
+        if key is not None and self.policy == "conflate":
+            queued = self._latest.get(key)
+            if queued is not None:
+                queued[1] = message
+                self.stats.conflated += 1
+                return True
+        
+        if len(self._items) >= self.maxsize:
+            if self.policy == "disconnect":
+                self.overflowed = True
+                self.stats.disconnected += 1
+                self.close()
+                return False
+            self._discard(self._items.popleft())
+            self.stats.dropped += 1
+        
+        item = [key, message]
+        self._items.append(item)
+        if key is not None:
+            self._latest[key] = item
+        self.stats.enqueued += 1
+        self._ready.set()
+        return True
+    
+    def _discard(self, item: list):
+        """Forget the conflation slot of an item leaving the queue"""
+        if item[0] is not None and self._latest.get(item[0]) is item:
+            del self._latest[item[0]]
+    
+    async def get(self):
+        """Wait for the next message, or return None once the queue is closed"""
+        while not self._items:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        
+        item = self._items.popleft()
+        self._discard(item)
+        self.stats.sent += 1
+        return item[1]
+    
+    def close(self):
+        """Stop accepting messages and wake the consumer"""
+        self.closed = True
+        self._items.clear()
+        self._latest.clear()
+        self._ready.set()
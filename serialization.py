@@ -0,0 +1,48 @@
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install orjson
+    orjson = None
+
+def _default(obj: Any):
+    """Encode the non-JSON types the stdlib encoder needs help with"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    def json_dumps_bytes(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    
+    def json_dumps(obj: Any) -> str:
+        """Serialize to a JSON string"""
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode()
+    
+    json_loads = orjson.loads
+
+else:
+    def json_dumps_bytes(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes"""
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+    
+    def json_dumps(obj: Any) -> str:
+        """Serialize to a JSON string"""
+        return json.dumps(obj, default=_default, separators=(",", ":"))
+    
+    json_loads = json.loads
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed, else the stdlib encoder"""
+    
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
@@ -3,6 +3,7 @@ class TradingDashboard {
         this.websocket = null;
         this.isConnected = false;
         this.stockPrices = new Map();
+        this.symbols = [];  // interned tickers of the compact stream protocol
         this.priceHistory = new Map();
         this.alerts = [];
         this.reconnectAttempts = 0;
@@ -46,7 +47,7 @@ class TradingDashboard {
             this.updateConnectionStatus('connecting');
             
             // Use Server-Sent Events instead of WebSocket for better compatibility
-            const sseUrl = '/stock-prices/stream';
+            const sseUrl = '/stock-prices/stream?protocol=compact';
             console.log('Connecting to price stream via SSE:', sseUrl);
             
             this.eventSource = new EventSource(sseUrl);
@@ -105,6 +106,8 @@ class TradingDashboard {
             
             if (data.type === 'price_update') {
                 this.updateStockPrice(data.ticker, data.price, data.timestamp);
+            } else if (data.type === 'trading_signal') {
+                this.handleTradingSignal(data);
             } else if (data.type === 'subscription_confirmed') {
                 console.log(`Subscribed to ${data.ticker}: $${data.price}`);
             }
@@ -119,12 +122,48 @@ class TradingDashboard {
             
             if (data.type === 'price_update') {
                 this.updateStockPrice(data.ticker, data.price, data.timestamp);
+            } else if (data.type === 'price_batch') {
+                data.prices.forEach(update => this.updateStockPrice(update.ticker, update.price, update.timestamp));
+            } else if (data.type === 'symbols') {
+                this.symbols = data.symbols;
+            } else if (data.type === 'delta') {
+                this.handleDelta(data);
+            } else if (data.type === 'trading_signal') {
+                this.handleTradingSignal(data);
+            } else if (data.type === 'price_alert') {
+                this.handlePriceAlert(data);
             }
         } catch (error) {
             console.error('Error parsing SSE message:', error);
         }
     }
     
+    handleDelta(data) {
+        // Each update is [ticker index, price, ms after the frame timestamp]
+        data.u.forEach(([index, price, offset]) => {
+            this.updateStockPrice(this.symbols[index], price, data.ts + offset);
+        });
+    }
+    
+    handleTradingSignal(data) {
+        const alertType = data.signal === 'BUY' ? 'success' : 'danger';
+        const alertMessage = `${data.signal} signal: ${data.ticker} @ $${data.price.toFixed(2)} (MA crossover ${data.short_ma.toFixed(2)} / ${data.long_ma.toFixed(2)})`;
+        
+        this.addAlert(alertMessage, alertType);
+        this.showToast(alertMessage, alertType);
+    }
+    
+    handlePriceAlert(data) {
+        const alertType = data.direction === 'up' ? 'success' : 'danger';
+        const condition = data.kind === 'cross'
+            ? `crossed ${data.direction === 'up' ? 'above' : 'below'} $${data.level.toFixed(2)}`
+            : `moved ${data.change_percent.toFixed(2)}% in ${data.window_seconds}s`;
+        const alertMessage = `Alert for ${data.owner}: ${data.ticker} ${condition} ($${data.price.toFixed(2)})`;
+        
+        this.addAlert(alertMessage, alertType);
+        this.showToast(alertMessage, alertType);
+    }
+    
     updateStockPrice(ticker, price, timestamp) {
         const previousPrice = this.stockPrices.get(ticker);
         this.stockPrices.set(ticker, { price, timestamp, previousPrice });
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Set, Tuple
+
+from config import settings
+from price_protocol import DeltaFrameBuilder, TickerTable, delta_message
+from send_queue import ClientSendQueue, SendQueueStats
+from serialization import json_dumps_bytes
+from utils import logger
+
+def encode_event(message: dict) -> bytes:
+    """Encode a message as a Server-Sent Events data frame"""
+    return b"data: " + json_dumps_bytes(message) + b"\n\n"
+
+def price_message(ticker: str, price: float, timestamp: datetime) -> dict:
+    """The JSON price_update message of one tick"""
+    return {"ticker": ticker, "price": price, "timestamp": timestamp, "type": "price_update"}
+
+class PriceStreamHub:
+    """Single producer for the SSE price stream: each tick is encoded once and fanned out to subscribers"""
+    
+    def __init__(self, tickers: Iterable[str] = None, batch_interval: float = None):
+        self.batch_interval = settings.SSE_BATCH_INTERVAL if batch_interval is None else batch_interval
+        self.subscribers: Set[ClientSendQueue] = set()
+        # Subscribers of the opt-in compact protocol receive batched delta frames instead
+        self.compact_subscribers: Set[ClientSendQueue] = set()
+        self.deltas = DeltaFrameBuilder(TickerTable(settings.STOCK_TICKERS if tickers is None else tickers))
+        self.stats = SendQueueStats()
+        
+        # Latest (price, timestamp) per ticker, replayed to new subscribers
+        self._latest_prices: Dict[str, Tuple[float, datetime]] = {}
+        # Prices waiting for the next batch frame when batching is enabled
+        self._pending_prices: Dict[str, dict] = {}
+        self._batch_task: Optional[asyncio.Task] = None
+        self.frames_published = 0
+    
+    async def start(self):
+        """Start the batch flush loop when batching is enabled"""
+        if self.batch_interval > 0 and self._batch_task is None:
+            self._batch_task = asyncio.create_task(self._run_batches())
+    
+    async def stop(self):
+        """Stop batching and close every subscriber queue"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+        for queue in self.subscribers | self.compact_subscribers:
+            queue.close()
+        self.subscribers.clear()
+        self.compact_subscribers.clear()
+    
+    def subscribe(self, protocol: str = "json") -> ClientSendQueue:
+        """Register a subscriber, primed with the latest price of every ticker"""
+        queue = ClientSendQueue(stats=self.stats)
+        
+        if protocol == "compact":
+            queue.put(encode_event(self.deltas.tickers.symbols_message()))
+            snapshot = self.deltas.snapshot()
+            if snapshot:
+                queue.put(encode_event(delta_message(snapshot)))
+            self.compact_subscribers.add(queue)
+        else:
+            for ticker, (price, timestamp) in self._latest_prices.items():
+                queue.put(encode_event(price_message(ticker, price, timestamp)), ticker)
+            self.subscribers.add(queue)
+        return queue
+    
+    def unsubscribe(self, queue: ClientSendQueue):
+        """Remove a subscriber and release its queue"""
+        self.subscribers.discard(queue)
+        self.compact_subscribers.discard(queue)
+        queue.close()
+    
+    def publish_round(self, tickers: Sequence[str], prices: Sequence[float], timestamp: datetime):
+        """Publish one tick of every ticker (prices already rounded), or hold them for the next batch frame"""
+        self._latest_prices.update(zip(tickers, zip(prices, repeat(timestamp))))
+        self.deltas.add_many(tickers, prices, timestamp)
+        
+        # Messages are only built when a JSON subscriber will receive them
+        if not self.subscribers:
+            return
+        if self.batch_interval > 0:
+            self._pending_prices.update(
+                (ticker, price_message(ticker, price, timestamp)) for ticker, price in zip(tickers, prices)
+            )
+        else:
+            # One event per tick, keyed by ticker so queued ticks of a ticker can be conflated
+            for ticker, price in zip(tickers, prices):
+                self.publish_frame(encode_event(price_message(ticker, price, timestamp)), ticker)
+    
+    def publish(self, message: dict):
+        """Publish a non-price message (e.g. a trading signal) to every subscriber of either protocol"""
+        frame = encode_event(message)
+        self.publish_frame(frame)
+        self._fan_out(self.compact_subscribers, frame)
+    
+    def publish_frame(self, frame: bytes, key: Optional[Hashable] = None):
+        """Fan an already encoded frame out to every JSON subscriber"""
+        self.frames_published += 1
+        self._fan_out(self.subscribers, frame, key)
+    
+    @staticmethod
+    def _fan_out(subscribers: Set[ClientSendQueue], frame: bytes, key: Optional[Hashable] = None):
+        """Queue a frame for each subscriber, dropping any that overflowed"""
+        overflowed = [queue for queue in subscribers if not queue.put(frame, key)]
+        for queue in overflowed:
+            subscribers.discard(queue)
+    
+    def flush_batch(self):
+        """Publish every pending price as a single batch frame"""
+        if not self._pending_prices:
+            return
+        prices, self._pending_prices = list(self._pending_prices.values()), {}
+        self.publish_frame(encode_event({"type": "price_batch", "prices": prices}))
+    
+    def flush_deltas(self):
+        """Publish the tickers that changed since the last delta frame to compact subscribers"""
+        entries = self.deltas.flush()
+        if self.deltas.symbols_changed:
+            self.deltas.symbols_changed = False
+            self._fan_out(self.compact_subscribers, encode_event(self.deltas.tickers.symbols_message()))
+        if entries and self.compact_subscribers:
+            self.frames_published += 1
+            self._fan_out(self.compact_subscribers, encode_event(delta_message(entries)))
+    
+    def end_round(self):
+        """Called by the producer after each round of ticks; emits delta frames unless batching on a timer"""
+        if self.batch_interval <= 0:
+            self.flush_deltas()
+    
+    async def _run_batches(self):
+        """Flush pending prices every batch interval"""
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            try:
+                self.flush_batch()
+                self.flush_deltas()
+            except Exception as e:
+                logger.error(f"Error publishing price batch: {str(e)}")
+    
+    def metrics(self) -> Dict:
+        """Subscriber and queue counters for monitoring"""
+        return {
+            "subscribers": len(self.subscribers),
+            "compact_subscribers": len(self.compact_subscribers),
+            "frames_published": self.frames_published,
+            **self.stats.metrics()
+        }
@@ -1,89 +1,392 @@
 import pandas as pd
 import numpy as np
+import os
+from pandas.api.types import union_categoricals
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Tuple
+from itertools import product
+from multiprocessing import shared_memory
+from typing import List, Dict, Tuple, Iterable, Optional, Sequence
 import logging
 
 from schemas import TradingSignal, ProfitLossReport
-from utils import calculate_moving_average, detect_crossover, calculate_profit_loss, format_currency
+from historical_cache import HistoricalDataCache
+from utils import (
+    moving_average, crossover_signal_codes, calculate_profit_loss_arrays, format_currency,
+    SIGNAL_BUY, SIGNAL_SELL, SIGNAL_LABELS
+)
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Price array and ticker bounds attached once per parameter-sweep worker process
+_sweep_state: Dict = {}
+
+def _attach_sweep_prices(shm_name: str, length: int, bounds: List[Tuple[int, int]]):
+    """Pool initializer: map the shared price array into this worker without copying"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _sweep_state['shm'] = shm
+    _sweep_state['prices'] = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+    _sweep_state['bounds'] = bounds
+
+def _sweep_task(ticker_range: Tuple[int, int], params: List[Tuple[int, int]], ma_type: str) -> List[Tuple]:
+    """Evaluate every parameter pair on a block of tickers, reusing each MA across pairs"""
+    prices = _sweep_state['prices']
+    bounds = _sweep_state['bounds']
+    rows = []
+    
+    for ticker_index in range(*ticker_range):
+        start, stop = bounds[ticker_index]
+        ticker_prices = prices[start:stop]
+        ma_cache = {}
+        
+        for short_period, long_period in params:
+            if stop - start < long_period:
+                continue
+            
+            for period in (short_period, long_period):
+                if period not in ma_cache:
+                    ma_cache[period] = moving_average(ticker_prices, period, ma_type)
+            
+            codes = crossover_signal_codes(ma_cache[short_period], ma_cache[long_period])
+            stats = calculate_profit_loss_arrays(codes, ticker_prices)
+            rows.append((
+                short_period,
+                long_period,
+                ticker_index,
+                int(np.count_nonzero(codes)),
+                stats['total_profit_loss'],
+                stats['winning_trades'],
+                stats['losing_trades']
+            ))
+    
+    return rows
+
+class _LiveTickerState:
+    """Ring buffer and running moving averages for one ticker in streaming mode"""
+    __slots__ = (
+        "window", "position", "count", "short_sum", "long_sum", "short_weighted", "long_weighted",
+        "short_ma", "long_ma", "prev_short_ma", "prev_long_ma"
+    )
+    
+    def __init__(self, long_period: int):
+        self.window = [0.0] * long_period
+        self.position = 0
+        self.count = 0
+        self.short_sum = 0.0
+        self.long_sum = 0.0
+        # Linearly weighted window sums (newest price weighted by the period) for WMA
+        self.short_weighted = 0.0
+        self.long_weighted = 0.0
+        self.short_ma = np.nan
+        self.long_ma = np.nan
+        self.prev_short_ma = np.nan
+        self.prev_long_ma = np.nan
+
+class _LiveRoundState:
+    """Column-per-ticker ring buffer and running moving averages for a universe that ticks together each round"""
+    __slots__ = (
+        "tickers", "window", "position", "count", "short_sum", "long_sum", "short_weighted", "long_weighted",
+        "short_ma", "long_ma", "prev_short_ma", "prev_long_ma"
+    )
+    
+    def __init__(self, tickers: Sequence[str], long_period: int):
+        size = len(tickers)
+        self.tickers = tickers
+        self.window = np.zeros((long_period, size))
+        self.position = 0
+        self.count = 0
+        self.short_sum = np.zeros(size)
+        self.long_sum = np.zeros(size)
+        self.short_weighted = np.zeros(size)
+        self.long_weighted = np.zeros(size)
+        self.short_ma = np.full(size, np.nan)
+        self.long_ma = np.full(size, np.nan)
+        self.prev_short_ma = np.full(size, np.nan)
+        self.prev_long_ma = np.full(size, np.nan)
+
 class MovingAverageCrossoverStrategy:
-    def __init__(self, short_period: int = None, long_period: int = None):
+    # Running sums are rebuilt from the ring buffer every this many long windows to bound float drift
+    LIVE_RESYNC_WINDOWS = 64
+    
+    def __init__(self, short_period: int = None, long_period: int = None, ma_type: str = None):
         self.short_period = short_period or settings.SHORT_MA_PERIOD
         self.long_period = long_period or settings.LONG_MA_PERIOD
+        self.ma_type = (ma_type or settings.MA_TYPE).lower()
         
         if self.short_period >= self.long_period:
             raise ValueError("Short period must be less than long period")
+        
+        # Fail fast on an unknown moving average type
+        moving_average(np.empty(0), self.short_period, self.ma_type)
+        
+        # Per-ticker state for the incremental (live tick) mode
+        self._live_state: Dict[str, _LiveTickerState] = {}
+        # Vectorized state for whole simulator rounds (update_round)
+        self._round_state: Optional[_LiveRoundState] = None
     
-    def load_historical_data(self, csv_file: str) -> pd.DataFrame:
-        """Load historical stock data from CSV file"""
+    def load_historical_data(
+        self,
+        csv_file: str,
+        tickers: Optional[Iterable[str]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        chunksize: Optional[int] = None,
+        use_cache: Optional[bool] = None
+    ) -> pd.DataFrame:
+        """Load historical stock data, from the columnar cache when one is current"""
         try:
-            df = pd.read_csv(csv_file)
+            use_cache = settings.HISTORICAL_CACHE_ENABLED if use_cache is None else use_cache
             
-            # Validate required columns
-            required_columns = ['ticker', 'date', 'price']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            if use_cache:
+                cache = HistoricalDataCache()
+                df = cache.load(csv_file, tickers=tickers, start_date=start_date, end_date=end_date)
+                
+                if df is not None:
+                    logger.info(f"Loaded {len(df)} cached records for {df['ticker'].nunique()} tickers")
+                    return df
+                
+                # Parse and cache the whole file once so later runs can select from it
+                full = self._read_csv(csv_file, chunksize=chunksize)
+                cache.store(csv_file, full)
+                df = cache.load(csv_file, tickers=tickers, start_date=start_date, end_date=end_date)
+                if df is None:
+                    # Nothing was cached (e.g. blank tickers); select from the parsed frame instead of re-reading
+                    df = self._filter_frame(full, tickers, start_date, end_date)
+                
+                logger.info(f"Loaded {len(df)} records for {df['ticker'].nunique()} tickers")
+                return df
             
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {missing_columns}")
+            df = self._read_csv(csv_file, tickers, start_date, end_date, chunksize)
             
-            # Convert date column to datetime
-            df['date'] = pd.to_datetime(df['date'])
+            logger.info(f"Loaded {len(df)} records for {df['ticker'].nunique()} tickers")
+            return df
             
-            # Sort by ticker and date
-            df = df.sort_values(['ticker', 'date']).reset_index(drop=True)
+        except Exception as e:
+            logger.error(f"Error loading historical data: {str(e)}")
+            raise
+    
+    def load_candle_data(
+        self,
+        tickers: Optional[Iterable[str]] = None,
+        interval: str = "1m",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """Load close prices of stored OHLCV bars in the same layout as load_historical_data"""
+        # Imported here so backtests on CSV data do not need the database package or a configured engine
+        from sqlalchemy import select
+        from database import engine
+        from models import Candle
+        
+        try:
+            query = select(
+                Candle.ticker,
+                Candle.bucket_start.label('date'),
+                Candle.close_price.label('price')
+            ).where(Candle.interval == interval)
             
-            # Validate data
-            if df['price'].isna().any():
-                logger.warning("Found missing price data, filling with forward fill")
-                df['price'] = df['price'].fillna(method='ffill')
+            if tickers:
+                query = query.where(Candle.ticker.in_([ticker.upper() for ticker in tickers]))
+            if start_date is not None:
+                query = query.where(Candle.bucket_start >= start_date)
+            if end_date is not None:
+                query = query.where(Candle.bucket_start <= end_date)
             
-            if (df['price'] <= 0).any():
-                raise ValueError("Found non-positive prices in data")
+            # The unique (ticker, interval, bucket_start) index returns rows already in order
+            query = query.order_by(Candle.ticker, Candle.bucket_start)
             
-            logger.info(f"Loaded {len(df)} records for {df['ticker'].nunique()} tickers")
+            with engine.connect() as conn:
+                df = pd.read_sql(query, conn, parse_dates=['date'])
+            df['ticker'] = df['ticker'].astype('category')
+            
+            logger.info(f"Loaded {len(df)} {interval} candles for {df['ticker'].nunique()} tickers")
             return df
             
         except Exception as e:
-            logger.error(f"Error loading historical data: {str(e)}")
+            logger.error(f"Error loading candle data: {str(e)}")
             raise
     
+    def _read_csv(
+        self,
+        csv_file: str,
+        tickers: Optional[Iterable[str]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        chunksize: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Parse a historical CSV file in fixed-dtype chunks"""
+        # Validate required columns from the header before streaming the body
+        required_columns = ['ticker', 'date', 'price']
+        header = pd.read_csv(csv_file, nrows=0).columns
+        missing_columns = [col for col in required_columns if col not in header]
+        
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        ticker_filter = set(tickers) if tickers else None
+        start_date = pd.Timestamp(start_date) if start_date is not None else None
+        end_date = pd.Timestamp(end_date) if end_date is not None else None
+        
+        reader = pd.read_csv(
+            csv_file,
+            usecols=required_columns,
+            dtype={'ticker': str, 'date': str, 'price': settings.HISTORICAL_PRICE_DTYPE},
+            chunksize=chunksize or settings.HISTORICAL_CSV_CHUNKSIZE
+        )
+        
+        # Only the filtered, compactly typed rows of each chunk are retained
+        chunks = []
+        for chunk in reader:
+            chunk['date'] = pd.to_datetime(chunk['date'], format=settings.HISTORICAL_DATE_FORMAT)
+            
+            if ticker_filter is not None:
+                chunk = chunk[chunk['ticker'].isin(ticker_filter)]
+            if start_date is not None:
+                chunk = chunk[chunk['date'] >= start_date]
+            if end_date is not None:
+                chunk = chunk[chunk['date'] <= end_date]
+            
+            if (chunk['price'] <= 0).any():
+                raise ValueError("Found non-positive prices in data")
+            
+            if len(chunk):
+                chunk = chunk.assign(ticker=chunk['ticker'].astype('category'))
+                chunks.append(chunk)
+        
+        df = self._combine_chunks(chunks)
+        
+        # Sort by ticker and date, skipping the full sort when the file is already ordered
+        if not self._is_sorted_by_ticker_and_date(df):
+            df = df.sort_values(['ticker', 'date'], kind='stable').reset_index(drop=True)
+        
+        # Validate data
+        if df['price'].isna().any():
+            logger.warning("Found missing price data, filling with forward fill")
+            df['price'] = df['price'].ffill()
+        
+        return df
+    
+    @staticmethod
+    def _filter_frame(
+        df: pd.DataFrame,
+        tickers: Optional[Iterable[str]],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ) -> pd.DataFrame:
+        """Select tickers and a date range from an already parsed, sorted frame"""
+        mask = np.ones(len(df), dtype=bool)
+        if tickers:
+            mask &= df['ticker'].isin(set(tickers)).to_numpy()
+        if start_date is not None:
+            mask &= (df['date'] >= pd.Timestamp(start_date)).to_numpy()
+        if end_date is not None:
+            mask &= (df['date'] <= pd.Timestamp(end_date)).to_numpy()
+        if mask.all():
+            return df
+        
+        df = df[mask].reset_index(drop=True)
+        df['ticker'] = df['ticker'].cat.remove_unused_categories()
+        return df
+    
+    @staticmethod
+    def _combine_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+        """Concatenate loaded chunks, unifying the per-chunk ticker categories"""
+        if not chunks:
+            return pd.DataFrame({
+                'ticker': pd.Categorical([]),
+                'date': pd.to_datetime(pd.Series([], dtype=str)),
+                'price': pd.Series([], dtype=settings.HISTORICAL_PRICE_DTYPE)
+            })
+        
+        tickers = union_categoricals([chunk['ticker'] for chunk in chunks], sort_categories=True)
+        df = pd.concat([chunk[['date', 'price']] for chunk in chunks], ignore_index=True)
+        df.insert(0, 'ticker', tickers)
+        return df
+    
+    @staticmethod
+    def _is_sorted_by_ticker_and_date(df: pd.DataFrame) -> bool:
+        """Check (ticker, date) ordering using the sorted category codes"""
+        if len(df) < 2:
+            return True
+        codes = df['ticker'].cat.codes.to_numpy()
+        dates = df['date'].to_numpy()
+        code_steps = np.diff(codes)
+        same_ticker = code_steps == 0
+        return bool((code_steps >= 0).all() and (dates[1:][same_ticker] >= dates[:-1][same_ticker]).all())
+    
+    def _partition_by_ticker(self, df: pd.DataFrame) -> Tuple[np.ndarray, pd.DatetimeIndex, List[Tuple[str, int, int]]]:
+        """Partition the frame once into contiguous per-ticker slices of price and date arrays"""
+        codes, tickers = pd.factorize(df['ticker'], sort=False)
+        prices = df['price'].to_numpy(dtype=np.float64)
+        dates = pd.DatetimeIndex(df['date'])
+        
+        # Rows without a ticker (factorized as -1) cannot belong to any partition
+        if (codes < 0).any():
+            valid = codes >= 0
+            codes, prices, dates = codes[valid], prices[valid], dates[valid]
+        
+        # Rows from load_historical_data are already grouped by ticker; otherwise
+        # reorder once with a stable sort so each ticker keeps its date order
+        if len(codes) > 1 and (np.diff(codes) < 0).any():
+            order = np.argsort(codes, kind='stable')
+            codes = codes[order]
+            prices = prices[order]
+            dates = dates[order]
+        
+        counts = np.bincount(codes, minlength=len(tickers))
+        stops = np.cumsum(counts)
+        starts = stops - counts
+        
+        groups = [
+            (ticker, start, stop)
+            for ticker, start, stop in zip(tickers.tolist(), starts.tolist(), stops.tolist())
+        ]
+        return prices, dates, groups
+    
+    def _signals_for_slice(self, ticker: str, prices: np.ndarray, dates: pd.DatetimeIndex) -> List[TradingSignal]:
+        """Run the moving average crossover kernel on one ticker's price and date arrays"""
+        # Calculate moving averages
+        short_ma = moving_average(prices, self.short_period, self.ma_type)
+        long_ma = moving_average(prices, self.long_period, self.ma_type)
+        
+        # Detect crossover signals and only materialize the sparse crossover rows
+        codes = crossover_signal_codes(short_ma, long_ma)
+        signal_indices = np.flatnonzero(codes)
+        
+        # Create trading signals
+        return [
+            TradingSignal(
+                ticker=ticker,
+                signal=SIGNAL_LABELS[code],
+                price=price,
+                short_ma=short,
+                long_ma=long,
+                timestamp=dates[i]
+            )
+            for i, code, price, short, long in zip(
+                signal_indices.tolist(),
+                codes[signal_indices].tolist(),
+                prices[signal_indices].tolist(),
+                short_ma[signal_indices].tolist(),
+                long_ma[signal_indices].tolist()
+            )
+        ]
+    
     def calculate_signals(self, df: pd.DataFrame) -> Dict[str, List[TradingSignal]]:
         """Calculate trading signals for all tickers"""
         results = {}
         
         try:
-            for ticker in df['ticker'].unique():
-                ticker_data = df[df['ticker'] == ticker].copy()
-                
-                if len(ticker_data) < self.long_period:
-                    logger.warning(f"Insufficient data for {ticker}: {len(ticker_data)} records")
+            prices, dates, groups = self._partition_by_ticker(df)
+            
+            for ticker, start, stop in groups:
+                if stop - start < self.long_period:
+                    logger.warning(f"Insufficient data for {ticker}: {stop - start} records")
                     continue
                 
-                # Calculate moving averages
-                prices = ticker_data['price'].tolist()
-                short_ma = calculate_moving_average(prices, self.short_period)
-                long_ma = calculate_moving_average(prices, self.long_period)
-                
-                # Detect crossover signals
-                signals = detect_crossover(short_ma, long_ma)
-                
-                # Create trading signals
-                trading_signals = []
-                for i, signal in enumerate(signals):
-                    if signal in ['BUY', 'SELL']:
-                        trading_signal = TradingSignal(
-                            ticker=ticker,
-                            signal=signal,
-                            price=prices[i],
-                            short_ma=short_ma[i] if not np.isnan(short_ma[i]) else 0,
-                            long_ma=long_ma[i] if not np.isnan(long_ma[i]) else 0,
-                            timestamp=ticker_data.iloc[i]['date']
-                        )
-                        trading_signals.append(trading_signal)
+                # Slices of the partitioned arrays are views, so no per-ticker copy is made
+                trading_signals = self._signals_for_slice(ticker, prices[start:stop], dates[start:stop])
                 
                 results[ticker] = trading_signals
                 logger.info(f"Generated {len(trading_signals)} signals for {ticker}")
@@ -94,6 +397,239 @@ class MovingAverageCrossoverStrategy:
         
         return results
     
+    def update(self, ticker: str, price: float, timestamp: datetime = None) -> Optional[TradingSignal]:
+        """Feed one live tick and return a TradingSignal if it completes a crossover (O(1) per tick)"""
+        state = self._live_state.get(ticker)
+        if state is None:
+            state = self._live_state[ticker] = _LiveTickerState(self.long_period)
+        
+        # Values leaving the short and long windows; the buffer holds exactly the last long_period prices
+        long_period, short_period = self.long_period, self.short_period
+        leaving_long = state.window[state.position] if state.count >= long_period else 0.0
+        leaving_short = state.window[(state.position - short_period) % long_period] if state.count >= short_period else 0.0
+        
+        state.window[state.position] = price
+        state.position = (state.position + 1) % long_period
+        state.count += 1
+        # Every price already in a window drops one weight step (the old window sum) and the new one enters at full weight
+        state.short_weighted += short_period * price - state.short_sum
+        state.long_weighted += long_period * price - state.long_sum
+        state.short_sum += price - leaving_short
+        state.long_sum += price - leaving_long
+        
+        if state.count % (long_period * self.LIVE_RESYNC_WINDOWS) == 0:
+            newest_first = [state.window[(state.position - i) % long_period] for i in range(1, long_period + 1)]
+            state.long_sum = sum(newest_first)
+            state.short_sum = sum(newest_first[:short_period])
+            state.long_weighted = sum((long_period - i) * value for i, value in enumerate(newest_first))
+            state.short_weighted = sum((short_period - i) * value for i, value in enumerate(newest_first[:short_period]))
+        
+        state.prev_short_ma, state.prev_long_ma = state.short_ma, state.long_ma
+        state.short_ma = self._next_live_ma(state.short_ma, state.short_sum, state.short_weighted, short_period, state.count, price)
+        state.long_ma = self._next_live_ma(state.long_ma, state.long_sum, state.long_weighted, long_period, state.count, price)
+        
+        # Same crossover rule as the batch engine: both MAs must exist on this tick and the previous one
+        if state.count <= long_period:
+            return None
+        
+        if state.prev_short_ma <= state.prev_long_ma and state.short_ma > state.long_ma:
+            signal = "BUY"
+        elif state.prev_short_ma >= state.prev_long_ma and state.short_ma < state.long_ma:
+            signal = "SELL"
+        else:
+            return None
+        
+        return TradingSignal(
+            ticker=ticker,
+            signal=signal,
+            price=price,
+            short_ma=state.short_ma,
+            long_ma=state.long_ma,
+            timestamp=timestamp or datetime.now()
+        )
+    
+    def update_round(self, tickers: Sequence[str], prices: np.ndarray, timestamp: datetime = None) -> List[TradingSignal]:
+        """Feed one tick of every ticker at once (same rules as update, vectorized across tickers)"""
+        state = self._round_state
+        if state is None or (state.tickers is not tickers and list(state.tickers) != list(tickers)):
+            # A different universe starts from scratch, like a new ticker in update()
+            state = self._round_state = _LiveRoundState(tickers, self.long_period)
+        
+        long_period, short_period = self.long_period, self.short_period
+        leaving_long = state.window[state.position] if state.count >= long_period else 0.0
+        leaving_short = state.window[(state.position - short_period) % long_period] if state.count >= short_period else 0.0
+        
+        # Read the leaving rows before the new prices overwrite the buffer slot
+        state.short_weighted = state.short_weighted + (short_period * prices - state.short_sum)
+        state.long_weighted = state.long_weighted + (long_period * prices - state.long_sum)
+        state.short_sum = state.short_sum + (prices - leaving_short)
+        state.long_sum = state.long_sum + (prices - leaving_long)
+        state.window[state.position] = prices
+        state.position = (state.position + 1) % long_period
+        state.count += 1
+        
+        if state.count % (long_period * self.LIVE_RESYNC_WINDOWS) == 0:
+            newest_first = state.window[[(state.position - i) % long_period for i in range(1, long_period + 1)]]
+            state.long_sum = newest_first.sum(axis=0)
+            state.short_sum = newest_first[:short_period].sum(axis=0)
+            state.long_weighted = np.arange(long_period, 0, -1.0) @ newest_first
+            state.short_weighted = np.arange(short_period, 0, -1.0) @ newest_first[:short_period]
+        
+        state.prev_short_ma, state.prev_long_ma = state.short_ma, state.long_ma
+        state.short_ma = self._next_live_ma_array(state.short_ma, state.short_sum, state.short_weighted, short_period, state.count, prices)
+        state.long_ma = self._next_live_ma_array(state.long_ma, state.long_sum, state.long_weighted, long_period, state.count, prices)
+        
+        if state.count <= long_period:
+            return []
+        
+        buys = (state.prev_short_ma <= state.prev_long_ma) & (state.short_ma > state.long_ma)
+        sells = (state.prev_short_ma >= state.prev_long_ma) & (state.short_ma < state.long_ma)
+        timestamp = timestamp or datetime.now()
+        return [
+            TradingSignal(
+                ticker=tickers[i],
+                signal="BUY" if buys[i] else "SELL",
+                price=float(prices[i]),
+                short_ma=float(state.short_ma[i]),
+                long_ma=float(state.long_ma[i]),
+                timestamp=timestamp
+            )
+            for i in np.flatnonzero(buys | sells)
+        ]
+    
+    def _next_live_ma_array(self, current: np.ndarray, window_sum: np.ndarray, weighted_sum: np.ndarray,
+                            period: int, count: int, prices: np.ndarray) -> np.ndarray:
+        """Vectorized _next_live_ma for a round state"""
+        if count < period:
+            return np.full(prices.shape[0], np.nan)
+        if self.ma_type == "ema" and count > period:
+            return current + (2.0 / (period + 1)) * (prices - current)
+        if self.ma_type == "wma":
+            return weighted_sum / (period * (period + 1) / 2)
+        return window_sum / period
+    
+    def _next_live_ma(self, current: float, window_sum: float, weighted_sum: float, period: int, count: int, price: float) -> float:
+        """Advance one live moving average given the running plain and weighted window sums"""
+        if count < period:
+            return np.nan
+        if self.ma_type == "ema" and count > period:
+            return current + (2.0 / (period + 1)) * (price - current)
+        if self.ma_type == "wma":
+            return weighted_sum / (period * (period + 1) / 2)
+        # SMA, and the SMA seed of the EMA on its first full window
+        return window_sum / period
+    
+    def reset_live_state(self, ticker: str = None):
+        """Drop streaming state for one ticker, or for all tickers"""
+        if ticker is None:
+            self._live_state.clear()
+        else:
+            self._live_state.pop(ticker, None)
+        self._round_state = None
+    
+    @staticmethod
+    def build_parameter_grid(short_periods: Iterable[int], long_periods: Iterable[int]) -> List[Tuple[int, int]]:
+        """Build every valid (short_period, long_period) combination"""
+        return [
+            (short_period, long_period)
+            for short_period, long_period in product(sorted(set(short_periods)), sorted(set(long_periods)))
+            if short_period < long_period
+        ]
+    
+    def sweep_parameters(
+        self,
+        df: pd.DataFrame,
+        param_grid: Iterable[Tuple[int, int]],
+        max_workers: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Backtest tickers x parameter pairs on a process pool and return a ranked results table"""
+        params = list(dict.fromkeys((int(short), int(long)) for short, long in param_grid))
+        if not params:
+            raise ValueError("Parameter grid is empty")
+        for short_period, long_period in params:
+            if short_period <= 0 or short_period >= long_period:
+                raise ValueError(f"Invalid parameter pair ({short_period}, {long_period}): short period must be positive and less than long period")
+        
+        max_workers = max_workers or settings.BACKTEST_MAX_WORKERS or os.cpu_count() or 1
+        prices, _, groups = self._partition_by_ticker(df)
+        bounds = [(start, stop) for _, start, stop in groups]
+        
+        # Split tickers and parameters into roughly four tasks per worker
+        target_tasks = max_workers * 4
+        ticker_chunks = [
+            (int(chunk[0]), int(chunk[-1]) + 1)
+            for chunk in np.array_split(np.arange(len(groups)), min(len(groups), target_tasks) or 1)
+            if len(chunk)
+        ]
+        param_chunk_count = min(len(params), max(1, -(-target_tasks // max(len(ticker_chunks), 1))))
+        param_chunks = [params[i::param_chunk_count] for i in range(param_chunk_count)]
+        tasks = list(product(ticker_chunks, param_chunks))
+        
+        try:
+            logger.info(
+                f"Sweeping {len(params)} parameter sets over {len(groups)} tickers "
+                f"in {len(tasks)} tasks with {max_workers} workers"
+            )
+            
+            if max_workers == 1 or len(tasks) <= 1:
+                _sweep_state.update(prices=prices, bounds=bounds)
+                try:
+                    task_rows = [_sweep_task(tickers, chunk, self.ma_type) for tickers, chunk in tasks]
+                finally:
+                    _sweep_state.clear()
+            else:
+                # Share the partitioned prices through shared memory instead of pickling frames
+                shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+                try:
+                    np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+                    with ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        initializer=_attach_sweep_prices,
+                        initargs=(shm.name, len(prices), bounds)
+                    ) as executor:
+                        # executor.map yields results in task order, keeping the output deterministic
+                        task_rows = list(executor.map(
+                            _sweep_task,
+                            [tickers for tickers, _ in tasks],
+                            [chunk for _, chunk in tasks],
+                            [self.ma_type] * len(tasks)
+                        ))
+                finally:
+                    shm.close()
+                    shm.unlink()
+        
+        except Exception as e:
+            logger.error(f"Error running parameter sweep: {str(e)}")
+            raise
+        
+        columns = ['short_period', 'long_period', 'ticker_index', 'total_signals', 'total_profit_loss', 'winning_trades', 'losing_trades']
+        per_ticker = pd.DataFrame([row for rows in task_rows for row in rows], columns=columns)
+        
+        results = (
+            per_ticker.groupby(['short_period', 'long_period'], sort=True)
+            .agg(
+                tickers=('ticker_index', 'size'),
+                total_signals=('total_signals', 'sum'),
+                total_profit_loss=('total_profit_loss', 'sum'),
+                winning_trades=('winning_trades', 'sum'),
+                losing_trades=('losing_trades', 'sum')
+            )
+            .reindex(pd.MultiIndex.from_tuples(params, names=['short_period', 'long_period']), fill_value=0)
+            .reset_index()
+        )
+        winning_trades = results['winning_trades'].to_numpy(dtype=np.float64)
+        closed_trades = winning_trades + results['losing_trades'].to_numpy(dtype=np.float64)
+        results['win_rate'] = np.divide(winning_trades * 100, closed_trades, out=np.zeros_like(closed_trades), where=closed_trades > 0)
+        
+        # Rank by total P&L, breaking ties on the parameters themselves
+        results = results.sort_values(
+            ['total_profit_loss', 'short_period', 'long_period'],
+            ascending=[False, True, True],
+            kind='stable'
+        ).reset_index(drop=True)
+        results.insert(0, 'rank', np.arange(1, len(results) + 1))
+        return results
+    
     def generate_report(self, signals_dict: Dict[str, List[TradingSignal]]) -> List[ProfitLossReport]:
         """Generate profit/loss report for all tickers"""
         reports = []
@@ -103,29 +639,28 @@ class MovingAverageCrossoverStrategy:
                 if not signals:
                     continue
                 
-                # Convert signals to trade format for P&L calculation
-                trades = [
-                    {
-                        'signal': signal.signal,
-                        'price': signal.price,
-                        'timestamp': signal.timestamp
-                    }
-                    for signal in signals
-                ]
+                # Convert signals to side/price arrays for the vectorized P&L engine
+                sides = np.fromiter(
+                    (SIGNAL_BUY if signal.signal == 'BUY' else SIGNAL_SELL for signal in signals),
+                    dtype=np.int8,
+                    count=len(signals)
+                )
+                prices = np.fromiter((signal.price for signal in signals), dtype=np.float64, count=len(signals))
                 
                 # Calculate profit/loss
-                total_pnl, winning_trades, losing_trades = calculate_profit_loss(trades)
-                total_trades = winning_trades + losing_trades
-                win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+                stats = calculate_profit_loss_arrays(sides, prices)
+                total_pnl = stats['total_profit_loss']
+                win_rate = stats['win_rate']
                 
                 # Create report
                 report = ProfitLossReport(
                     ticker=ticker,
                     total_trades=len(signals),
                     total_profit_loss=total_pnl,
-                    winning_trades=winning_trades,
-                    losing_trades=losing_trades,
+                    winning_trades=stats['winning_trades'],
+                    losing_trades=stats['losing_trades'],
                     win_rate=win_rate,
+                    max_drawdown=stats['max_drawdown'],
                     signals=signals
                 )
                 
@@ -152,6 +687,7 @@ class MovingAverageCrossoverStrategy:
         print(f"Strategy Parameters:")
         print(f"  Short MA Period: {self.short_period} days")
         print(f"  Long MA Period: {self.long_period} days")
+        print(f"  Moving Average Type: {self.ma_type.upper()}")
         print()
         
         total_pnl_all = 0
@@ -164,6 +700,7 @@ class MovingAverageCrossoverStrategy:
             print(f"  Winning Trades: {report.winning_trades}")
             print(f"  Losing Trades: {report.losing_trades}")
             print(f"  Win Rate: {report.win_rate:.1f}%")
+            print(f"  Max Drawdown: {format_currency(report.max_drawdown)}")
             print()
             
             # Show recent signals
@@ -185,13 +722,19 @@ class MovingAverageCrossoverStrategy:
         print(f"Total P&L: {format_currency(total_pnl_all)}")
         print("="*80)
     
-    def run_strategy(self, csv_file: str = "sample_historical_data.csv") -> List[ProfitLossReport]:
+    def run_strategy(
+        self,
+        csv_file: str = "sample_historical_data.csv",
+        tickers: Optional[Iterable[str]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[ProfitLossReport]:
         """Run the complete trading strategy"""
         try:
             logger.info("Starting Moving Average Crossover Strategy...")
             
             # Load historical data
-            df = self.load_historical_data(csv_file)
+            df = self.load_historical_data(csv_file, tickers=tickers, start_date=start_date, end_date=end_date)
             
             # Calculate signals
             signals_dict = self.calculate_signals(df)
@@ -1,87 +1,150 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple
-from datetime import datetime, timedelta
+from array import array
+from typing import List, Dict, Tuple, Optional
+from datetime import datetime
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def sma_array(prices: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average over a price array using a cumulative sum (O(n))"""
+    prices = np.asarray(prices, dtype=np.float64)
+    result = np.full(prices.shape[0], np.nan)
+    if period <= 0 or prices.shape[0] < period:
+        return result
+    
+    cumsum = np.cumsum(np.concatenate(([0.0], prices)))
+    result[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period
+    return result
+
+def ema_array(prices: np.ndarray, period: int) -> np.ndarray:
+    """Exponential moving average seeded with the SMA of the first window"""
+    prices = np.asarray(prices, dtype=np.float64)
+    result = np.full(prices.shape[0], np.nan)
+    if period <= 0 or prices.shape[0] < period:
+        return result
+    
+    # Leading NaNs are skipped by pandas, so the EMA starts from the SMA seed
+    seeded = prices.copy()
+    seeded[:period - 1] = np.nan
+    seeded[period - 1] = prices[:period].mean()
+    alpha = 2.0 / (period + 1)
+    result[:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return result
+
+def wma_array(prices: np.ndarray, period: int) -> np.ndarray:
+    """Linearly weighted moving average (most recent price has weight `period`)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    result = np.full(prices.shape[0], np.nan)
+    if period <= 0 or prices.shape[0] < period:
+        return result
+    
+    weights = np.arange(1, period + 1, dtype=np.float64)
+    # np.convolve flips the kernel, so reverse it to weight the newest price highest
+    result[period - 1:] = np.convolve(prices, weights[::-1], mode="valid") / weights.sum()
+    return result
+
+MOVING_AVERAGE_ENGINES = {
+    "sma": sma_array,
+    "ema": ema_array,
+    "wma": wma_array,
+}
+
+def moving_average(prices: np.ndarray, period: int, ma_type: str = "sma") -> np.ndarray:
+    """Calculate a moving average of the given type ("sma", "ema" or "wma") as an array"""
+    try:
+        engine = MOVING_AVERAGE_ENGINES[ma_type.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown moving average type: {ma_type}")
+    return engine(prices, period)
+
 def calculate_moving_average(prices: List[float], period: int) -> List[float]:
     """Calculate moving average for given prices and period"""
-    if len(prices) < period:
-        return [np.nan] * len(prices)
+    return sma_array(prices, period).tolist()
+
+# Integer signal codes used by the array-based crossover and P&L engines
+SIGNAL_HOLD = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_LABELS = {SIGNAL_HOLD: "HOLD", SIGNAL_BUY: "BUY", SIGNAL_SELL: "SELL"}
+
+def crossover_signal_codes(short_ma: np.ndarray, long_ma: np.ndarray) -> np.ndarray:
+    """Detect moving average crossovers as an int8 array of SIGNAL_* codes"""
+    short_ma = np.asarray(short_ma, dtype=np.float64)
+    long_ma = np.asarray(long_ma, dtype=np.float64)
+    codes = np.zeros(short_ma.shape[0], dtype=np.int8)
+    if short_ma.shape[0] < 2:
+        return codes
     
-    ma_values = []
-    for i in range(len(prices)):
-        if i < period - 1:
-            ma_values.append(np.nan)
-        else:
-            ma_values.append(np.mean(prices[i - period + 1:i + 1]))
+    prev_short, curr_short = short_ma[:-1], short_ma[1:]
+    prev_long, curr_long = long_ma[:-1], long_ma[1:]
     
-    return ma_values
+    # Comparisons against NaN are False, so windows without both MAs stay HOLD
+    buy = (prev_short <= prev_long) & (curr_short > curr_long)
+    sell = (prev_short >= prev_long) & (curr_short < curr_long)
+    
+    codes[1:][buy] = SIGNAL_BUY
+    codes[1:][sell] = SIGNAL_SELL
+    return codes
 
 def detect_crossover(short_ma: List[float], long_ma: List[float]) -> List[str]:
     """Detect moving average crossovers and generate signals"""
-    signals = []
-    
-    for i in range(1, len(short_ma)):
-        if np.isnan(short_ma[i]) or np.isnan(long_ma[i]) or np.isnan(short_ma[i-1]) or np.isnan(long_ma[i-1]):
-            signals.append("HOLD")
-            continue
-            
-        # Buy signal: short MA crosses above long MA
-        if short_ma[i-1] <= long_ma[i-1] and short_ma[i] > long_ma[i]:
-            signals.append("BUY")
-        # Sell signal: short MA crosses below long MA
-        elif short_ma[i-1] >= long_ma[i-1] and short_ma[i] < long_ma[i]:
-            signals.append("SELL")
-        else:
-            signals.append("HOLD")
-    
-    return ["HOLD"] + signals  # First value is always HOLD
+    codes = crossover_signal_codes(short_ma, long_ma)
+    return [SIGNAL_LABELS[code] for code in codes.tolist()]
+
+def calculate_profit_loss_arrays(sides: np.ndarray, prices: np.ndarray) -> Dict:
+    """Vectorized flip-position P&L: realized P&L, win/loss counts, drawdown and equity curve"""
+    sides = np.asarray(sides, dtype=np.int8)
+    prices = np.asarray(prices, dtype=np.float64)
+    equity_curve = np.zeros(sides.shape[0])
+    
+    # HOLD rows never trade, and a repeated signal in the same direction leaves the position unchanged
+    signal_indices = np.flatnonzero(sides)
+    signal_sides = sides[signal_indices]
+    changes = np.ones(signal_sides.shape[0], dtype=bool)
+    changes[1:] = signal_sides[1:] != signal_sides[:-1]
+    trade_indices = signal_indices[changes]
+    trade_sides = signal_sides[changes].astype(np.float64)
+    trade_prices = prices[trade_indices]
+    
+    # Every trade after the first closes the unit position opened by the previous one at its price
+    realized = trade_sides[:-1] * (trade_prices[1:] - trade_prices[:-1])
+    equity_curve[trade_indices[1:]] = realized
+    equity_curve = np.cumsum(equity_curve)
+    
+    winning_trades = int(np.count_nonzero(realized > 0))
+    losing_trades = int(realized.shape[0]) - winning_trades
+    closed_trades = winning_trades + losing_trades
+    
+    if equity_curve.shape[0]:
+        peaks = np.maximum.accumulate(np.maximum(equity_curve, 0.0))
+        max_drawdown = float(np.max(peaks - equity_curve))
+    else:
+        max_drawdown = 0.0
+    
+    return {
+        'total_profit_loss': float(equity_curve[-1]) if equity_curve.shape[0] else 0.0,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'win_rate': (winning_trades / closed_trades * 100) if closed_trades > 0 else 0.0,
+        'max_drawdown': max_drawdown,
+        'equity_curve': equity_curve
+    }
 
 def calculate_profit_loss(trades: List[Dict]) -> Tuple[float, int, int]:
     """Calculate total profit/loss and trade statistics"""
     if not trades:
         return 0.0, 0, 0
     
-    total_pnl = 0.0
-    winning_trades = 0
-    losing_trades = 0
-    position = 0
-    avg_cost = 0
-    
-    for trade in trades:
-        if trade['signal'] == 'BUY':
-            if position == 0:
-                position = 1
-                avg_cost = trade['price']
-            elif position < 0:  # Covering short position
-                pnl = (avg_cost - trade['price']) * abs(position)
-                total_pnl += pnl
-                if pnl > 0:
-                    winning_trades += 1
-                else:
-                    losing_trades += 1
-                position = 1
-                avg_cost = trade['price']
-        elif trade['signal'] == 'SELL':
-            if position == 0:
-                position = -1
-                avg_cost = trade['price']
-            elif position > 0:  # Selling long position
-                pnl = (trade['price'] - avg_cost) * position
-                total_pnl += pnl
-                if pnl > 0:
-                    winning_trades += 1
-                else:
-                    losing_trades += 1
-                position = -1
-                avg_cost = trade['price']
-    
-    return total_pnl, winning_trades, losing_trades
+    signal_codes = {"BUY": SIGNAL_BUY, "SELL": SIGNAL_SELL}
+    sides = np.fromiter((signal_codes.get(trade['signal'], SIGNAL_HOLD) for trade in trades), dtype=np.int8, count=len(trades))
+    prices = np.fromiter((trade.get('price', np.nan) for trade in trades), dtype=np.float64, count=len(trades))
+    
+    stats = calculate_profit_loss_arrays(sides, prices)
+    return stats['total_profit_loss'], stats['winning_trades'], stats['losing_trades']
 
 def format_currency(amount: float) -> str:
     """Format currency amount"""
@@ -93,48 +156,97 @@ def calculate_percentage_change(old_price: float, new_price: float) -> float:
         return 0.0
     return ((new_price - old_price) / old_price) * 100
 
+class _TickerHistory:
+    """Append-only price/timestamp arrays for one ticker with a movable front"""
+    __slots__ = ("prices", "timestamps", "head", "window_start")
+    
+    def __init__(self):
+        self.prices = array('d')
+        self.timestamps = array('d')  # POSIX seconds
+        self.head = 0  # first entry still inside the history horizon
+        self.window_start = 0  # first entry inside the change-detection window
+    
+    def __len__(self) -> int:
+        return len(self.prices) - self.head
+
 class PriceTracker:
     """Track price changes and detect significant movements"""
+    __slots__ = ("threshold_percent", "history_seconds", "window_seconds", "_history")
+    
+    # Evicted entries are physically removed once they make up half the buffer
+    COMPACT_MIN_ENTRIES = 1024
     
-    def __init__(self, threshold_percent: float = 2.0):
+    def __init__(self, threshold_percent: float = 2.0, history_seconds: float = 3600, window_seconds: float = 60):
         self.threshold_percent = threshold_percent
-        self.price_history: Dict[str, List[Tuple[float, datetime]]] = {}
+        self.history_seconds = history_seconds
+        self.window_seconds = window_seconds
+        self._history: Dict[str, _TickerHistory] = {}
     
     def add_price(self, ticker: str, price: float, timestamp: datetime = None):
-        """Add a new price point for tracking"""
+        """Add a new price point for tracking (timestamps are expected in arrival order)"""
         if timestamp is None:
             timestamp = datetime.now()
+        ts = timestamp.timestamp()
         
-        if ticker not in self.price_history:
-            self.price_history[ticker] = []
+        history = self._history.get(ticker)
+        if history is None:
+            history = self._history[ticker] = _TickerHistory()
         
-        self.price_history[ticker].append((price, timestamp))
+        history.prices.append(price)
+        history.timestamps.append(ts)
         
-        # Keep only last hour of data for efficiency
-        cutoff_time = timestamp - timedelta(hours=1)
-        self.price_history[ticker] = [
-            (p, t) for p, t in self.price_history[ticker] if t >= cutoff_time
-        ]
-    
-    def check_significant_change(self, ticker: str) -> bool:
-        """Check if price has changed significantly in the last minute"""
-        if ticker not in self.price_history or len(self.price_history[ticker]) < 2:
-            return False
+        # Keep only last hour of data for efficiency by advancing the front pointer
+        cutoff = ts - self.history_seconds
+        timestamps = history.timestamps
+        while timestamps[history.head] < cutoff:
+            history.head += 1
         
-        current_time = datetime.now()
-        one_minute_ago = current_time - timedelta(minutes=1)
+        if history.head >= self.COMPACT_MIN_ENTRIES and history.head * 2 >= len(timestamps):
+            del history.prices[:history.head]
+            del history.timestamps[:history.head]
+            history.window_start = max(history.window_start - history.head, 0)
+            history.head = 0
         
-        # Get prices from the last minute
-        recent_prices = [
-            price for price, timestamp in self.price_history[ticker]
-            if timestamp >= one_minute_ago
-        ]
+        history.window_start = max(history.window_start, history.head)
+    
+    def window_change(self, ticker: str, now: datetime = None) -> Optional[Tuple[float, float]]:
+        """Return the (oldest, newest) prices inside the change window, or None with fewer than two"""
+        history = self._history.get(ticker)
+        if history is None or len(history) < 2:
+            return None
         
-        if len(recent_prices) < 2:
-            return False
+        # The window start only moves forward, so each entry is skipped at most once
+        window_cutoff = (now or datetime.now()).timestamp() - self.window_seconds
+        timestamps = history.timestamps
+        end = len(timestamps)
+        while history.window_start < end and timestamps[history.window_start] < window_cutoff:
+            history.window_start += 1
         
-        old_price = recent_prices[0]
-        new_price = recent_prices[-1]
+        if end - history.window_start < 2:
+            return None
+        return history.prices[history.window_start], history.prices[end - 1]
+    
+    def check_significant_change(self, ticker: str) -> bool:
+        """Check if price has changed significantly in the last minute"""
+        prices = self.window_change(ticker)
+        if prices is None:
+            return False
         
+        old_price, new_price = prices
         change_percent = abs(calculate_percentage_change(old_price, new_price))
         return change_percent >= self.threshold_percent
+    
+    def get_history(self, ticker: str) -> List[Tuple[float, datetime]]:
+        """Return the tracked (price, timestamp) history for a ticker"""
+        history = self._history.get(ticker)
+        if history is None:
+            return []
+        return [
+            (history.prices[i], datetime.fromtimestamp(history.timestamps[i]))
+            for i in range(history.head, len(history.prices))
+        ]
+    
+    @property
+    def price_history(self) -> Dict[str, List[Tuple[float, datetime]]]:
+        """Snapshot of all tracked histories as (price, timestamp) lists"""
+        return {ticker: self.get_history(ticker) for ticker in self._history}
@@ -6,11 +6,15 @@ import websockets
 from websockets.client import WebSocketClientProtocol
 
 from config import settings
+from price_protocol import decode_delta_binary, expand_delta
+from serialization import json_loads
 from utils import PriceTracker, calculate_percentage_change, logger
 
 class StockPriceClient:
-    def __init__(self):
+    def __init__(self, protocol: str = None):
         self.price_tracker = PriceTracker(threshold_percent=settings.PRICE_CHANGE_THRESHOLD)
+        self.protocol = protocol or settings.STREAM_PROTOCOL
+        self.symbols = []  # interned ticker table for compact/binary delta frames
         self.websocket_url = f"ws://{settings.WEBSOCKET_HOST}:{settings.WEBSOCKET_PORT}"
         self.running = False
     
@@ -37,6 +41,10 @@ class StockPriceClient:
                         await websocket.send(json.dumps(subscribe_message))
                         logger.info(f"Subscribed to {ticker}")
                     
+                    # Opt into batched delta frames
+                    if self.protocol != "json":
+                        await websocket.send(json.dumps({"type": "set_protocol", "protocol": self.protocol}))
+                    
                     # Listen for messages
                     async for message in websocket:
                         await self.handle_message(message)
@@ -64,10 +72,10 @@ class StockPriceClient:
                 else:
                     break
     
-    async def handle_message(self, message: str):
-        """Handle incoming WebSocket messages"""
+    async def handle_message(self, message):
+        """Handle incoming WebSocket messages (JSON text or binary delta frames)"""
         try:
-            data = json.loads(message)
+            data = decode_delta_binary(message) if isinstance(message, bytes) else json_loads(message)
             
             if data.get("type") == "price_update":
                 ticker = data.get("ticker")
@@ -77,16 +85,24 @@ class StockPriceClient:
                 if ticker and price is not None:
                     # Parse timestamp
                     timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    
-                    # Add price to tracker
-                    self.price_tracker.add_price(ticker, price, timestamp)
-                    
-                    # Check for significant price changes
-                    if self.price_tracker.check_significant_change(ticker):
-                        await self.notify_significant_change(ticker, price)
-                    
-                    # Log price update
-                    logger.info(f"Price update: {ticker} = ${price:.2f} at {timestamp}")
+                    await self.handle_price_update(ticker, price, timestamp)
+            
+            elif data.get("type") == "symbols":
+                self.symbols = data.get("symbols", [])
+            
+            elif data.get("type") == "delta":
+                for ticker, price, timestamp in expand_delta(data, self.symbols):
+                    await self.handle_price_update(ticker, price, timestamp)
+            
+            elif data.get("type") == "trading_signal":
+                ticker = data.get("ticker")
+                signal = data.get("signal")
+                price = data.get("price")
+                logger.info(
+                    f"Trading signal: {signal} {ticker} at ${price:.2f} "
+                    f"(short MA={data.get('short_ma'):.2f}, long MA={data.get('long_ma'):.2f})"
+                )
+                print(f"\n📣 {signal} signal for {ticker} at ${price:.2f}\n")
             
             elif data.get("type") == "subscription_confirmed":
                 ticker = data.get("ticker")
@@ -98,32 +114,35 @@ class StockPriceClient:
         except Exception as e:
             logger.error(f"Error handling message: {str(e)}")
     
-    async def notify_significant_change(self, ticker: str, current_price: float):
+    async def handle_price_update(self, ticker: str, price: float, timestamp: datetime):
+        """Track a price update and alert on significant changes"""
+        # Add price to tracker
+        self.price_tracker.add_price(ticker, price, timestamp)
+        
+        # Check for significant price changes in the window ending at this tick
+        prices = self.price_tracker.window_change(ticker, timestamp)
+        if prices is not None:
+            change_percent = calculate_percentage_change(prices[0], price)
+            if abs(change_percent) >= self.price_tracker.threshold_percent:
+                await self.notify_significant_change(ticker, prices[0], price, change_percent)
+        
+        # Log price update
+        logger.info(f"Price update: {ticker} = ${price:.2f} at {timestamp}")
+    
+    async def notify_significant_change(self, ticker: str, old_price: float, current_price: float, change_percent: float):
         """Send notification for significant price changes"""
         try:
-            # Get price history for the last minute
-            if ticker in self.price_tracker.price_history:
-                recent_prices = [
-                    price for price, timestamp in self.price_tracker.price_history[ticker]
-                    if (datetime.now() - timestamp).total_seconds() <= 60
-                ]
-                
-                if len(recent_prices) >= 2:
-                    old_price = recent_prices[0]
-                    change_percent = calculate_percentage_change(old_price, current_price)
-                    
-                    if abs(change_percent) >= settings.PRICE_CHANGE_THRESHOLD:
-                        direction = "↑" if change_percent > 0 else "↓"
-                        
-                        notification = (
-                            f"🚨 PRICE ALERT: {ticker} {direction} "
-                            f"{abs(change_percent):.2f}% in 1 minute! "
-                            f"${old_price:.2f} → ${current_price:.2f}"
-                        )
-                        
-                        logger.warning(notification)
-                        print(f"\n{notification}\n")
-                        
+            direction = "↑" if change_percent > 0 else "↓"
+            
+            notification = (
+                f"🚨 PRICE ALERT: {ticker} {direction} "
+                f"{abs(change_percent):.2f}% in 1 minute! "
+                f"${old_price:.2f} → ${current_price:.2f}"
+            )
+            
+            logger.warning(notification)
+            print(f"\n{notification}\n")
+            
         except Exception as e:
             logger.error(f"Error sending notification: {str(e)}")
     
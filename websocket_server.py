@@ -1,26 +1,50 @@
 import asyncio
 import json
 import logging
-import random
 from datetime import datetime
-from typing import Set
+from itertools import chain
+from typing import Dict, Iterable, Set
 import websockets
 import websockets.server
 
 from config import settings
-from database import SessionLocal
-from models import StockPrice
+from ingestion import PriceIngestionWriter
+from market_simulator import create_price_source
+from price_protocol import STREAM_PROTOCOLS, DeltaFrameBuilder, TickerTable, encode_delta, select_entries
+from schemas import TradingSignal
+from send_queue import ClientSendQueue, SendQueueStats
+from serialization import json_dumps, json_loads
+from trading_strategy import MovingAverageCrossoverStrategy
 from utils import logger
 
 class StockPriceServer:
     def __init__(self):
         self.clients: Set = set()
-        self.stock_prices = {ticker: random.uniform(100, 500) for ticker in settings.STOCK_TICKERS}
+        # Clients that never subscribed receive every ticker; the rest only their subscriptions
+        self.unfiltered_clients: Set = set()
+        self.price_source = create_price_source()
+        self.ticker_clients: Dict[str, Set] = {ticker: set() for ticker in self.price_source.tickers}
+        self.client_tickers: Dict = {}
+        # Each client is written to by its own sender task draining a bounded queue
+        self.send_queues: Dict = {}
+        self.send_tasks: Dict = {}
+        self.queue_stats = SendQueueStats()
+        # Per-client stream protocol ("json" unless the client opts into compact/binary deltas)
+        self.client_protocols: Dict = {}
+        self.deltas = DeltaFrameBuilder(TickerTable(self.price_source.tickers))
+        self.stock_prices = self.price_source.price_map()
+        self.strategy = MovingAverageCrossoverStrategy(settings.LIVE_SHORT_MA_PERIOD, settings.LIVE_LONG_MA_PERIOD)
+        self.price_writer = PriceIngestionWriter()
         self.running = False
     
     async def register_client(self, websocket):
         """Register a new WebSocket client"""
         self.clients.add(websocket)
+        self.unfiltered_clients.add(websocket)
+        self.client_tickers[websocket] = set()
+        self.client_protocols[websocket] = "json"
+        self.send_queues[websocket] = ClientSendQueue(stats=self.queue_stats)
+        self.send_tasks[websocket] = asyncio.create_task(self.send_loop(websocket, self.send_queues[websocket]))
         logger.info(f"Client connected. Total clients: {len(self.clients)}")
         
         # Send current prices to new client
@@ -28,85 +52,184 @@ class StockPriceServer:
             message = {
                 "ticker": ticker,
                 "price": round(price, 2),
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": datetime.now(),
                 "type": "price_update"
             }
-            try:
-                await websocket.send(json.dumps(message))
-            except websockets.exceptions.ConnectionClosed:
-                break
+            self.send_queues[websocket].put(json_dumps(message), ticker)
     
     async def unregister_client(self, websocket):
         """Unregister a WebSocket client"""
         self.clients.discard(websocket)
+        self.unfiltered_clients.discard(websocket)
+        for ticker in self.client_tickers.pop(websocket, ()):
+            self.ticker_clients[ticker].discard(websocket)
+        self.client_protocols.pop(websocket, None)
+        queue = self.send_queues.pop(websocket, None)
+        if queue is not None:
+            queue.close()
+        task = self.send_tasks.pop(websocket, None)
+        if task is not None:
+            task.cancel()
         logger.info(f"Client disconnected. Total clients: {len(self.clients)}")
     
-    async def broadcast_price_update(self, ticker: str, price: float):
+    async def broadcast_price_update(self, ticker: str, price: float, volume: int):
         """Broadcast price update to all connected clients"""
+        timestamp = datetime.now()
+        self.deltas.add(ticker, price, timestamp)
         if not self.clients:
             return
         
         message = {
             "ticker": ticker,
             "price": round(price, 2),
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "type": "price_update"
         }
         
         # Store price in database
-        await self.store_price(ticker, price)
+        await self.store_price(ticker, price, volume)
         
-        # Broadcast to all clients
-        disconnected_clients = set()
-        for client in self.clients:
-            try:
-                await client.send(json.dumps(message))
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
+        # Broadcast to clients following this ticker; queued prices of a ticker may be conflated
+        await self.broadcast_message(message, ticker, conflate=True, protocol="json")
+    
+    async def broadcast_trading_signal(self, signal: TradingSignal):
+        """Broadcast a live moving average crossover signal to clients following its ticker"""
+        if not self.clients:
+            return
+        
+        await self.broadcast_message({**signal.model_dump(mode="json"), "type": "trading_signal"}, signal.ticker)
+    
+    def recipients(self, ticker: str = None) -> Iterable:
+        """Clients that should receive a message about ticker (every client when ticker is None)"""
+        if ticker is None:
+            return self.clients
+        return chain(self.unfiltered_clients, self.ticker_clients.get(ticker, ()))
+    
+    async def broadcast_message(self, message: dict, ticker: str = None, conflate: bool = False, protocol: str = None):
+        """Serialize a message once and queue it for every recipient without waiting on slow clients"""
+        payload = json_dumps(message)
+        key = ticker if conflate else None
+        for client in self.recipients(ticker):
+            if protocol is None or self.client_protocols[client] == protocol:
+                self.send_queues[client].put(payload, key)
+    
+    async def broadcast_deltas(self):
+        """Send the tickers that changed this round to compact/binary clients as one frame each"""
+        entries = self.deltas.flush()
+        if self.deltas.symbols_changed:
+            self.deltas.symbols_changed = False
+            await self.broadcast_message(self.deltas.tickers.symbols_message(), protocol="compact")
+            await self.broadcast_message(self.deltas.tickers.symbols_message(), protocol="binary")
+        if not entries:
+            return
+        
+        # Clients sharing a protocol and subscription set share one encoded frame
+        frames = {}
+        for client, protocol in self.client_protocols.items():
+            if protocol == "json":
+                continue
+            tickers = None if client in self.unfiltered_clients else frozenset(self.client_tickers[client])
+            frame_key = (protocol, tickers)
+            if frame_key not in frames:
+                indexes = None if tickers is None else [self.deltas.tickers.intern(ticker) for ticker in tickers]
+                selected = select_entries(entries, indexes)
+                frames[frame_key] = encode_delta(selected, protocol) if selected else None
+            if frames[frame_key] is not None:
+                self.send_queues[client].put(frames[frame_key])
+    
+    def set_protocol(self, websocket, protocol: str) -> bool:
+        """Switch a client's stream protocol and prime compact clients with symbols and a snapshot"""
+        if protocol not in STREAM_PROTOCOLS:
+            return False
+        
+        self.client_protocols[websocket] = protocol
+        if protocol != "json":
+            self.send(websocket, self.deltas.tickers.symbols_message())
+            tickers = None if websocket in self.unfiltered_clients else self.client_tickers[websocket]
+            indexes = None if tickers is None else [self.deltas.tickers.intern(ticker) for ticker in tickers]
+            snapshot = select_entries(self.deltas.snapshot(), indexes)
+            if snapshot:
+                self.send_queues[websocket].put(encode_delta(snapshot, protocol))
+        return True
+    
+    def send(self, websocket, message: dict):
+        """Queue a message for one client"""
+        queue = self.send_queues.get(websocket)
+        if queue is not None:
+            queue.put(json_dumps(message))
+    
+    async def send_loop(self, websocket, queue: ClientSendQueue):
+        """Write queued messages to one client, closing the connection if its queue overflowed"""
+        try:
+            while (payload := await queue.get()) is not None:
+                await websocket.send(payload)
+            if queue.overflowed:
+                logger.warning(f"Disconnecting slow client after {queue.maxsize} unsent messages")
+                await websocket.close(code=1013, reason="Slow consumer")
+        except websockets.exceptions.ConnectionClosed:
+            pass
+    
+    def metrics(self) -> Dict:
+        """Connection and send queue counters for monitoring"""
+        return {
+            "clients": len(self.clients),
+            "queued": sum(len(queue) for queue in self.send_queues.values()),
+            **self.queue_stats.metrics(),
+            "simulator": self.price_source.metrics()
+        }
+    
+    def subscribe(self, websocket, tickers: Iterable[str]) -> Set[str]:
+        """Restrict a client to the given tickers (added to any earlier subscriptions)"""
+        subscribed = {ticker for ticker in tickers if ticker in self.ticker_clients}
+        if subscribed:
+            self.unfiltered_clients.discard(websocket)
+        for ticker in subscribed:
+            self.ticker_clients[ticker].add(websocket)
+        self.client_tickers[websocket] |= subscribed
+        return subscribed
+    
+    def unsubscribe(self, websocket, tickers: Iterable[str]) -> Set[str]:
+        """Stop sending the given tickers to a client"""
+        if websocket in self.unfiltered_clients:
+            # An unfiltered client follows every ticker; it keeps the rest of the universe
+            removed = set(tickers) & self.ticker_clients.keys()
+            if removed:
+                self.subscribe(websocket, self.ticker_clients.keys() - removed)
+                self.unfiltered_clients.discard(websocket)
+            return removed
         
-        # Remove disconnected clients
-        for client in disconnected_clients:
-            self.clients.discard(client)
+        removed = self.client_tickers[websocket] & set(tickers)
+        for ticker in removed:
+            self.ticker_clients[ticker].discard(websocket)
+        self.client_tickers[websocket] -= removed
+        return removed
     
-    async def store_price(self, ticker: str, price: float):
-        """Store price in database"""
+    async def store_price(self, ticker: str, price: float, volume: int):
+        """Queue price for batched storage in the database"""
         try:
-            db = SessionLocal()
-            db_price = StockPrice(
-                ticker=ticker,
-                price=round(price, 2),
-                timestamp=datetime.now()
-            )
-            db.add(db_price)
-            db.commit()
-            db.close()
+            await self.price_writer.submit(ticker, round(price, 2), datetime.now(), volume)
         except Exception as e:
             logger.error(f"Error storing price for {ticker}: {str(e)}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
     
     async def generate_price_updates(self):
-        """Generate random price updates for all tickers"""
-        while self.running:
+        """Broadcast simulated price updates for all tickers, one vectorized simulator step per round"""
+        async for prices, volumes in self.price_source.rounds():
+            if not self.running:
+                break
             try:
-                # Update prices for all tickers
-                for ticker in settings.STOCK_TICKERS:
-                    # Generate realistic price movement (±5% max change)
-                    current_price = self.stock_prices[ticker]
-                    change_percent = random.uniform(-0.05, 0.05)  # ±5%
-                    new_price = current_price * (1 + change_percent)
-                    
-                    # Ensure price doesn't go below $1
-                    new_price = max(new_price, 1.0)
-                    
-                    self.stock_prices[ticker] = new_price
-                    
+                self.stock_prices.update(zip(self.price_source.tickers, prices.tolist()))
+                for ticker, new_price, volume in zip(self.price_source.tickers, prices.tolist(), volumes.tolist()):
                     # Broadcast update
-                    await self.broadcast_price_update(ticker, new_price)
+                    await self.broadcast_price_update(ticker, new_price, volume)
+                    
+                    # Update live moving averages and broadcast any crossover
+                    signal = self.strategy.update(ticker, new_price)
+                    if signal:
+                        logger.info(f"Live {signal.signal} signal for {ticker} at ${new_price:.2f}")
+                        await self.broadcast_trading_signal(signal)
                 
-                # Wait 1-3 seconds before next update
-                await asyncio.sleep(random.uniform(1, 3))
+                # Emit one delta frame per round to compact/binary clients
+                await self.broadcast_deltas()
                 
             except Exception as e:
                 logger.error(f"Error generating price updates: {str(e)}")
@@ -118,22 +241,33 @@ class StockPriceServer:
         try:
             async for message in websocket:
                 try:
-                    data = json.loads(message)
+                    data = json_loads(message)
                     logger.info(f"Received message from client: {data}")
                     
                     # Handle different message types
+                    # Both accept a single "ticker" or a list of "tickers"
+                    tickers = data.get("tickers") or [data.get("ticker")]
+                    
                     if data.get("type") == "subscribe":
-                        ticker = data.get("ticker")
-                        if ticker and ticker in settings.STOCK_TICKERS:
+                        for ticker in self.subscribe(websocket, tickers):
                             # Send current price for requested ticker
                             current_price = self.stock_prices[ticker]
                             response = {
                                 "ticker": ticker,
                                 "price": round(current_price, 2),
-                                "timestamp": datetime.now().isoformat(),
+                                "timestamp": datetime.now(),
                                 "type": "subscription_confirmed"
                             }
-                            await websocket.send(json.dumps(response))
+                            self.send(websocket, response)
+                    
+                    elif data.get("type") == "unsubscribe":
+                        for ticker in self.unsubscribe(websocket, tickers):
+                            self.send(websocket, {"ticker": ticker, "type": "unsubscribed"})
+                    
+                    elif data.get("type") == "set_protocol":
+                        protocol = data.get("protocol")
+                        if self.set_protocol(websocket, protocol):
+                            self.send(websocket, {"protocol": protocol, "type": "protocol_confirmed"})
                     
                 except json.JSONDecodeError:
                     logger.warning(f"Invalid JSON received from client: {message}")
@@ -149,7 +283,8 @@ class StockPriceServer:
         """Start the WebSocket server"""
         self.running = True
         
-        # Start price generation task
+        # Start the batched database writer and price generation task
+        await self.price_writer.start()
         asyncio.create_task(self.generate_price_updates())
         
         # Start WebSocket server
@@ -160,7 +295,11 @@ class StockPriceServer:
         ) as server:
             logger.info(f"WebSocket server started on {settings.WEBSOCKET_HOST}:{settings.WEBSOCKET_PORT}")
             # Keep server running
-            await asyncio.Future()  # Run forever
+            try:
+                await asyncio.Future()  # Run forever
+            finally:
+                self.running = False
+                await self.price_writer.stop()
 
 async def main():
     server = StockPriceServer()